@@ -0,0 +1,99 @@
+"""Load benchmark for AsyncChatbot against local stub backends.
+
+Usage:
+    python bench/bench_async.py [--requests N] [--concurrency C]
+                                [--retrieval-latency S] [--first-token-latency S]
+
+Retrieval is a blocking stub run on a thread pool (like the Chroma
+retriever), generation is a FakeBackend; no network access is needed.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from async_chatbot import AsyncChatbot, AsyncResponseGenerator, AsyncRetriever
+from generator import FakeBackend, ResponseGenerator
+
+
+class StubRetriever:
+    """Blocking retriever that sleeps `latency` seconds and returns fixed rows."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def query(self, query, n_results=5, query_embedding=None, where=None):
+        time.sleep(self.latency)
+        rows = [f"Country: Stub {i}, Capital: City {i}, Population: {i * 1000}, Area: {i}.0"
+                for i in range(n_results)]
+        return {
+            "ids": [[f"country_stub-{i}" for i in range(n_results)]],
+            "documents": [rows],
+            "metadatas": [[{"name": f"Stub {i}"} for i in range(n_results)]],
+        }
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(args):
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    backend = FakeBackend(
+        reply="The answer is in the context above. " * 4,
+        chunk_size=8,
+        first_token_latency=args.first_token_latency,
+        chunk_latency=args.chunk_latency,
+    )
+    chatbot = AsyncChatbot(
+        AsyncRetriever(StubRetriever(args.retrieval_latency), executor),
+        AsyncResponseGenerator(ResponseGenerator(backend=backend), executor),
+        timeout=args.timeout,
+    )
+
+    latencies = []
+    first_tokens = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            first = None
+            async for _ in chatbot.get_response_stream(f"question {i}"):
+                if first is None:
+                    first = time.perf_counter() - start
+            latencies.append(time.perf_counter() - start)
+            first_tokens.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+
+    print(f"requests     {args.requests}")
+    print(f"concurrency  {args.concurrency}")
+    print(f"QPS          {args.requests / elapsed:,.1f}")
+    print(f"p50 latency  {statistics.median(latencies) * 1000:,.1f} ms")
+    print(f"p99 latency  {percentile(latencies, 99) * 1000:,.1f} ms")
+    print(f"p50 TTFT     {statistics.median(first_tokens) * 1000:,.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--retrieval-latency", type=float, default=0.02)
+    parser.add_argument("--first-token-latency", type=float, default=0.1)
+    parser.add_argument("--chunk-latency", type=float, default=0.005)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the country extractor backends.
+
+Usage:
+    python bench/bench_extractor.py [--rows N] [--repeat R] [page.html ...]
+
+Saved HTML pages can be passed as arguments, otherwise a synthetic page
+with the scrapethissite markup and N rows is generated.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from extractor import BACKENDS, extract_countries
+
+ROW_TEMPLATE = """
+<div class="col-md-4 country">
+    <h3 class="country-name">
+        <i class="flag-icon flag-icon-xx"></i>
+        Country {i}
+    </h3>
+    <div class="country-info">
+        <strong>Capital:</strong> <span class="country-capital">Capital {i}</span><br>
+        <strong>Population:</strong> <span class="country-population">{population}</span><br>
+        <strong>Area (km<sup>2</sup>):</strong> <span class="country-area">{area}</span><br>
+    </div>
+</div>
+"""
+
+
+def synthetic_page(rows, start=0):
+    body = "".join(
+        ROW_TEMPLATE.format(i=i, population=1000 + i * 37, area=f"{10.0 + i * 1.5:.1f}")
+        for i in range(start, start + rows)
+    )
+    return f"<html><body><section><div class=\"container\"><div class=\"row\">{body}</div></div></section></body></html>"
+
+
+def bench(html, backend, repeat):
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(extract_countries(html, backend=backend))
+        best = min(best, time.perf_counter() - start)
+    return rows, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved HTML pages to parse")
+    parser.add_argument("--rows", type=int, default=10_000, help="rows in the synthetic page")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per backend, best is reported")
+    args = parser.parse_args()
+
+    if args.pages:
+        fixtures = []
+        for path in args.pages:
+            with open(path, encoding="utf-8") as file:
+                fixtures.append((os.path.basename(path), file.read()))
+    else:
+        fixtures = [(f"synthetic-{args.rows}", synthetic_page(args.rows))]
+
+    print(f"{'fixture':<24}{'backend':<12}{'rows':>8}{'seconds':>10}{'rows/sec':>12}")
+    for name, html in fixtures:
+        for backend in BACKENDS:
+            rows, seconds = bench(html, backend, args.repeat)
+            print(f"{name:<24}{backend:<12}{rows:>8}{seconds:>10.3f}{rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
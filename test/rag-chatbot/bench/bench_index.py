@@ -0,0 +1,86 @@
+"""Compare retrieval latency and recall of ChromaIndex and NumpyIndex.
+
+Usage:
+    python bench/bench_index.py [--rows N] [--dim D] [--queries Q] [--k K]
+
+Both indexes hold the same random vectors. Recall@k is measured against
+exact cosine search; latency is per single-query call, as the retriever
+issues them.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from vector_index import ChromaIndex, NumpyIndex
+
+
+def build_chroma(ids, documents, metadatas, vectors):
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(
+        name="bench_index", embedding_function=None, metadata={"hnsw:space": "cosine"}
+    )
+    for start in range(0, len(ids), 5000):
+        end = start + 5000
+        collection.add(ids=ids[start:end], documents=documents[start:end],
+                       metadatas=metadatas[start:end], embeddings=vectors[start:end])
+    return ChromaIndex(collection)
+
+
+def bench(index, queries, k, exact):
+    latencies = []
+    recalls = []
+    for query, truth in zip(queries, exact):
+        start = time.perf_counter()
+        result = index.query(query_embeddings=[query], n_results=k)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(set(result["ids"][0]) & truth) / k)
+    return statistics.median(latencies), float(np.percentile(latencies, 99)), statistics.mean(recalls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.rows, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    ids = [f"row_{i}" for i in range(args.rows)]
+    documents = [f"document {i}" for i in range(args.rows)]
+    metadatas = [{"bucket": i % 10} for i in range(args.rows)]
+
+    numpy_index = NumpyIndex(ids, documents, metadatas, vectors)
+    normalized_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    exact_top = np.argsort(-(normalized_queries @ numpy_index.vectors.T), axis=1)[:, :args.k]
+    exact = [{ids[i] for i in row} for row in exact_top]
+
+    start = time.perf_counter()
+    chroma_index = build_chroma(ids, documents, metadatas, vectors)
+    chroma_build = time.perf_counter() - start
+
+    print(f"{args.rows} rows, dim {args.dim}, {args.queries} queries, k={args.k}")
+    print(f"{'index':<8}{'p50 ms':>10}{'p99 ms':>10}{'recall':>10}")
+    for name, index in (("chroma", chroma_index), ("numpy", numpy_index)):
+        p50, p99, recall = bench(index, queries, args.k, exact)
+        print(f"{name:<8}{p50 * 1000:>10.3f}{p99 * 1000:>10.3f}{recall:>10.3f}")
+    print(f"chroma build: {chroma_build:.2f}s")
+
+    start = time.perf_counter()
+    numpy_index.query(query_embeddings=queries, n_results=args.k)
+    batched = time.perf_counter() - start
+    print(f"numpy batched: {args.queries} queries in {batched * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Local load test for the HTTP server.
+
+Usage:
+    python bench/bench_server.py [--workers W] [--concurrency C] [--requests N]
+                                 [--max-in-flight M] [--stream] [--output results.json]
+
+Starts src/server.py's pre-forked server on a free local port with a
+chatbot built from the offline fixtures (synthetic embeddings, FakeBackend
+with configurable latency), then drives it from C client threads, each on
+its own keep-alive session. Reports QPS, latency percentiles, time to first
+event for SSE and how many requests were turned away with 503.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import requests
+
+from bench_extractor import synthetic_page
+from fixtures import SyntheticEmbeddingFunction
+from bm25 import BM25Index
+from chatbot import Chatbot
+from extractor import extract_countries
+from generator import FakeBackend, ResponseGenerator
+from retriever import Retriever
+from server import serve
+from structured import CountryIndex
+from sync import build_rows
+from vector_index import NumpyIndex
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_server(args, port):
+    # Built once before the workers fork, shared by all of them
+    documents, metadatas, ids = build_rows(extract_countries(synthetic_page(args.rows)))
+    embedding_function = SyntheticEmbeddingFunction(args.dim)
+    index = NumpyIndex(ids, documents, metadatas, embedding_function(documents))
+    lexical_index = BM25Index.from_index(index)
+    country_index = CountryIndex(metadatas)
+
+    def build_chatbot():
+        backend = FakeBackend(
+            reply="The answer is in the context above. " * 4,
+            chunk_size=8,
+            first_token_latency=args.first_token_latency,
+            chunk_latency=args.chunk_latency,
+        )
+        return Chatbot(
+            Retriever(index, SyntheticEmbeddingFunction(args.dim, latency=args.embed_latency),
+                      lexical_index, mode="hybrid"),
+            ResponseGenerator(backend=backend),
+            country_index=country_index,
+        )
+
+    serve(build_chatbot, port=port, workers=args.workers, max_in_flight=args.max_in_flight)
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url + "/health", timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def client(url, questions, stream, results, lock):
+    session = requests.Session()
+    for question in questions:
+        start = time.perf_counter()
+        first = None
+        if stream:
+            response = session.post(url + "/chat", json={"message": question, "stream": True}, stream=True)
+            # Read byte by byte so each event is seen as soon as it arrives
+            for line in response.iter_lines(chunk_size=1):
+                if first is None and line.startswith(b"data:"):
+                    first = time.perf_counter() - start
+            response.close()
+        else:
+            response = session.post(url + "/chat", json={"message": question})
+            response.content
+        with lock:
+            results.append((response.status_code, time.perf_counter() - start, first))
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--stream", action="store_true", help="request SSE streams")
+    parser.add_argument("--rows", type=int, default=250)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--first-token-latency", type=float, default=0.1)
+    parser.add_argument("--chunk-latency", type=float, default=0.005)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.get_context("fork").Process(target=run_server, args=(args, port), daemon=True)
+    server.start()
+    try:
+        wait_ready(url)
+        questions = [f"What is special about Country {i % args.rows}?" for i in range(args.requests)]
+        results = []
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=client, args=(url, questions[i::args.concurrency], args.stream, results, lock))
+            for i in range(args.concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.join()
+
+    ok = [latency for status, latency, _ in results if status == 200]
+    first = [value for status, _, value in results if status == 200 and value is not None]
+    report = {
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "max_in_flight": args.max_in_flight,
+        "stream": args.stream,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected": sum(1 for status, _, _ in results if status == 503),
+        "errors": sum(1 for status, _, _ in results if status not in (200, 503)),
+        "qps": len(ok) / elapsed,
+        "p50_ms": float(np.percentile(ok, 50) * 1000) if ok else None,
+        "p95_ms": float(np.percentile(ok, 95) * 1000) if ok else None,
+        "p99_ms": float(np.percentile(ok, 99) * 1000) if ok else None,
+        "p50_first_event_ms": float(np.percentile(first, 50) * 1000) if first else None,
+    }
+    for key, value in report.items():
+        print(f"{key:<20}{value:,.1f}" if isinstance(value, float) else f"{key:<20}{value}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
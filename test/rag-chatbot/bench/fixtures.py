@@ -0,0 +1,196 @@
+"""Offline stand-ins for the network services used by the chatbot.
+
+- `FixtureAdapter` serves recorded (or synthetic) HTML to a requests
+  session, so `PageFetcher` runs unchanged without touching the network.
+- `SyntheticEmbeddingFunction` replaces the Google embedding function with
+  deterministic vectors derived from each text's hash.
+- `FakeGeminiModel` mimics `genai.GenerativeModel.generate_content` and can
+  be wrapped in `GeminiBackend`; `FakeBackend` in generator.py covers the
+  backend interface directly.
+
+All of them take a configurable latency to model the real service.
+
+Usage:
+    python bench/fixtures.py --record [URL ...]
+
+saves the live pages to bench/fixtures/ so later runs replay real markup.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+DEFAULT_URLS = ["https://www.scrapethissite.com/pages/simple/"]
+
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+from bench_extractor import synthetic_page
+
+
+def recorded_pages():
+    """Return {file name: html} for every page saved in bench/fixtures/."""
+    pages = {}
+    if os.path.isdir(FIXTURE_DIR):
+        for name in sorted(os.listdir(FIXTURE_DIR)):
+            if name.endswith(".html"):
+                with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as file:
+                    pages[name] = file.read()
+    return pages
+
+
+def fixture_site(pages, rows_per_page=250):
+    """Map `pages` fixture URLs to HTML.
+
+    Recorded pages are used in turn when there are any, otherwise each page
+    is a synthetic scrapethissite page with `rows_per_page` countries.
+    """
+    recorded = list(recorded_pages().values())
+    site = {}
+    for i in range(pages):
+        url = f"fixture://countries/page-{i}"
+        if recorded:
+            site[url] = recorded[i % len(recorded)]
+        else:
+            site[url] = synthetic_page(rows_per_page, start=i * rows_per_page)
+    return site
+
+
+class FixtureAdapter(BaseAdapter):
+    """requests transport adapter answering from an in-memory {url: html} map.
+
+    Sleeps `latency` seconds per request and honours If-None-Match, so the
+    fetcher's conditional GETs behave as against a real server.
+    """
+
+    def __init__(self, site, latency=0.0):
+        super().__init__()
+        self.site = site
+        self.latency = latency
+        self.requests = 0
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        html = self.site.get(request.url)
+        if html is None:
+            response.status_code = 404
+            response._content = b""
+            return response
+        etag = '"%s"' % hashlib.sha1(html.encode("utf-8")).hexdigest()
+        response.headers["ETag"] = etag
+        if request.headers.get("If-None-Match") == etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response.headers["Content-Type"] = "text/html; charset=utf-8"
+            response._content = html.encode("utf-8")
+        return response
+
+    def close(self):
+        pass
+
+
+def fixture_session(site, latency=0.0):
+    """A requests session whose fixture:// URLs are served by a FixtureAdapter."""
+    session = requests.Session()
+    session.mount("fixture://", FixtureAdapter(site, latency))
+    return session
+
+
+class SyntheticEmbeddingFunction:
+    """Deterministic embeddings: the same text always maps to the same unit vector.
+
+    Each call sleeps `latency` seconds plus `per_text_latency` per input, to
+    model the round trip and throughput of a hosted embedding API.
+    """
+
+    def __init__(self, dimension=768, latency=0.0, per_text_latency=0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+        self._model_name = f"synthetic-{dimension}"
+
+    def vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def __call__(self, input):
+        texts = list(input)
+        self.calls += 1
+        delay = self.latency + self.per_text_latency * len(texts)
+        if delay:
+            time.sleep(delay)
+        return [self.vector(text).tolist() for text in texts]
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Stand-in for `genai.GenerativeModel` with the generate_content() surface GeminiBackend uses."""
+
+    def __init__(self, reply="The answer is in the context above.", chunk_size=8,
+                 first_token_latency=0.0, chunk_latency=0.0, model_name="models/fake-gemini"):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.first_token_latency = first_token_latency
+        self.chunk_latency = chunk_latency
+        self.model_name = model_name
+
+    def _chunks(self):
+        for start in range(0, len(self.reply), self.chunk_size):
+            delay = self.first_token_latency if start == 0 else self.chunk_latency
+            if delay:
+                time.sleep(delay)
+            yield _Chunk(self.reply[start:start + self.chunk_size])
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._chunks()
+        return _Chunk("".join(chunk.text for chunk in self._chunks()))
+
+
+def record(urls, directory=FIXTURE_DIR):
+    """Download `urls` into `directory` as page-N.html and return the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, url in enumerate(urls):
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        path = os.path.join(directory, f"page-{i}.html")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(response.text)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="save live pages as fixtures")
+    parser.add_argument("urls", nargs="*", default=DEFAULT_URLS)
+    args = parser.parse_args()
+    if not args.record:
+        parser.print_help()
+        return
+    for path in record(args.urls):
+        print(f"recorded {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Offline end-to-end benchmark suite.
+
+Usage:
+    python bench/run_bench.py [--pages P] [--rows-per-page R] [--sizes 1000,100000,1000000]
+                              [--output results.json] [--compare baseline.json]
+
+Runs every stage against the stand-ins in fixtures.py, so no network or
+API key is needed and results are reproducible:
+
+    scrape_parse  PageFetcher + extract_countries over fixture pages
+    ingest        build_rows + IngestPipeline into an in-memory Chroma collection
+    retrieval     NumpyIndex query latency at each size in --sizes
+    end_to_end    Chatbot (hybrid retrieval + Gemini stub) latency and QPS
+
+Results are written as JSON (bench/results/ by default). Pass an earlier
+file with --compare to print the change of every metric.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from fixtures import (BENCH_DIR, FakeGeminiModel, SyntheticEmbeddingFunction,
+                      fixture_session, fixture_site)
+from bm25 import BM25Index
+from chatbot import Chatbot
+from extractor import default_backend, extract_countries
+from fetcher import PageFetcher
+from generator import GeminiBackend, ResponseGenerator
+from ingest import IngestPipeline
+from retriever import Retriever
+from sync import build_rows
+from vector_index import NumpyIndex
+
+
+def latency_stats(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def bench_scrape_parse(args):
+    site = fixture_site(args.pages, args.rows_per_page)
+    with PageFetcher(max_workers=8, session=fixture_session(site, args.fetch_latency)) as fetcher:
+        start = time.perf_counter()
+        countries = list(fetcher.stream_records(site, extract_countries))
+        seconds = time.perf_counter() - start
+    return countries, {
+        "backend": default_backend(),
+        "pages": len(site),
+        "rows": len(countries),
+        "seconds": seconds,
+        "pages_per_sec": len(site) / seconds,
+        "rows_per_sec": len(countries) / seconds,
+    }
+
+
+def bench_ingest(args, countries):
+    import chromadb
+    from chromadb.config import Settings
+
+    documents, metadatas, ids = build_rows(countries)
+    embedding_function = SyntheticEmbeddingFunction(
+        args.dim, latency=args.embed_latency, per_text_latency=args.embed_per_text_latency
+    )
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    collection = client.get_or_create_collection(name="bench_ingest", embedding_function=None)
+    pipeline = IngestPipeline(collection, embedding_function, batch_size=args.batch_size,
+                              max_workers=args.ingest_workers)
+    metrics = pipeline.run(documents, metadatas, ids)
+    client.delete_collection("bench_ingest")
+    return (documents, metadatas, ids), {
+        "rows": metrics.rows_done,
+        "batches": metrics.batches_done,
+        "seconds": metrics.elapsed,
+        "rows_per_sec": metrics.rows_per_sec,
+        "embedding_calls": embedding_function.calls,
+    }
+
+
+def random_index(rows, dim, rng):
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 100_000):
+        block = rng.standard_normal((min(100_000, rows - start), dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        vectors[start:start + len(block)] = block
+    ids = [f"row_{i}" for i in range(rows)]
+    metadatas = [{"bucket": i % 10} for i in range(rows)]
+    return NumpyIndex(ids, ids, metadatas, vectors, normalized=True)
+
+
+def bench_retrieval(args):
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in args.sizes:
+        index = random_index(size, args.dim, rng)
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.query(query_embeddings=[query], n_results=args.k)
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.query(query_embeddings=queries, n_results=args.k)
+        batched = time.perf_counter() - start
+        results[str(size)] = {
+            **latency_stats(latencies),
+            "batched_qps": args.queries / batched,
+        }
+        del index
+    return results
+
+
+def bench_end_to_end(args, rows):
+    documents, metadatas, ids = rows
+    embedding_function = SyntheticEmbeddingFunction(args.dim, latency=args.embed_latency)
+    vectors = embedding_function(documents)
+    index = NumpyIndex(ids, documents, metadatas, vectors, embedding_function)
+    model = FakeGeminiModel(
+        reply="The answer is in the context above. " * 4,
+        first_token_latency=args.first_token_latency,
+        chunk_latency=args.chunk_latency,
+    )
+    chatbot = Chatbot(
+        Retriever(index, embedding_function, BM25Index.from_index(index), mode="hybrid"),
+        ResponseGenerator(backend=GeminiBackend(model)),
+    )
+    names = [metadata["name"] for metadata in metadatas]
+    questions = [f"Tell me about the people living in {names[i % len(names)]}"
+                 for i in range(args.requests)]
+
+    latencies = []
+    start = time.perf_counter()
+    for question in questions[:min(len(questions), 50)]:
+        request_start = time.perf_counter()
+        chatbot.get_response(question)
+        latencies.append(time.perf_counter() - request_start)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chatbot.get_responses(questions, max_workers=args.concurrency)
+    batched = time.perf_counter() - start
+    return {
+        **latency_stats(latencies),
+        "sequential_qps": len(latencies) / sequential,
+        "batched_qps": len(questions) / batched,
+        "concurrency": args.concurrency,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = flatten(json.load(file)["results"])
+    print(f"\n{'metric':<40}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, value in flatten(results).items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:<40}{old:>14,.3f}{value:>14,.3f}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--rows-per-page", type=int, default=250)
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="seconds per page request")
+    parser.add_argument("--dim", type=int, default=128, help="embedding dimension")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding call")
+    parser.add_argument("--embed-per-text-latency", type=float, default=0.0005)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--ingest-workers", type=int, default=4)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="index sizes for the retrieval stage")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--first-token-latency", type=float, default=0.1)
+    parser.add_argument("--chunk-latency", type=float, default=0.005)
+    parser.add_argument("--output", help="results file (default bench/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    started = datetime.now(timezone.utc)
+    results = {}
+    countries, results["scrape_parse"] = bench_scrape_parse(args)
+    print(f"scrape_parse  {results['scrape_parse']['rows_per_sec']:>12,.0f} rows/sec")
+    rows, results["ingest"] = bench_ingest(args, countries)
+    print(f"ingest        {results['ingest']['rows_per_sec']:>12,.0f} rows/sec")
+    results["retrieval"] = bench_retrieval(args)
+    for size, stats in results["retrieval"].items():
+        print(f"retrieval     {int(size):>12,} rows  p50 {stats['p50_ms']:.3f} ms  p99 {stats['p99_ms']:.3f} ms")
+    results["end_to_end"] = bench_end_to_end(args, rows)
+    print(f"end_to_end    {results['end_to_end']['batched_qps']:>12,.1f} QPS  "
+          f"p50 {results['end_to_end']['p50_ms']:.1f} ms")
+
+    report = {
+        "started": started.isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "args": vars(args),
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"bench-{started.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    print(f"wrote {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
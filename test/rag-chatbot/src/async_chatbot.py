@@ -0,0 +1,199 @@
+import asyncio
+import threading
+
+from memory import ConversationMemory
+from planner import plan_query
+
+_DONE = object()
+
+
+class AsyncRetriever:
+    """Run a blocking `Retriever` on an executor so retrievals overlap on one event loop."""
+
+    def __init__(self, retriever, executor=None):
+        self.retriever = retriever
+        self.executor = executor
+
+    async def query(self, query, n_results=5, where=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.retriever.query, query, n_results, None, where)
+
+    async def retrieve(self, query, n_results=5):
+        results = await self.query(query, n_results)
+        return results['documents'], results['metadatas']
+
+
+class AsyncResponseGenerator:
+    """Async iterator over the chunks of a `ResponseGenerator`.
+
+    Backends that provide `astream()` are awaited directly; blocking
+    backends are pumped from a worker thread, which stops pulling chunks as
+    soon as the consumer goes away (cancellation, timeout or early exit).
+    """
+
+    def __init__(self, generator, executor=None):
+        self.generator = generator
+        self.executor = executor
+        self.model = generator.model
+
+    async def generate_stream(self, context, user_query, history=None):
+        backend = self.generator.backend
+        if hasattr(backend, "astream"):
+            async for chunk in backend.astream(self.generator.build_prompt(context, user_query, history)):
+                yield chunk
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                stop.set()  # Event loop already closed
+
+        def produce():
+            try:
+                for chunk in self.generator.generate_stream(context, user_query, history):
+                    if stop.is_set():
+                        return
+                    put((chunk, None))
+            except Exception as exc:
+                put((None, exc))
+                return
+            put((_DONE, None))
+
+        loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                chunk, exc = await queue.get()
+                if exc is not None:
+                    raise exc
+                if chunk is _DONE:
+                    return
+                yield chunk
+        finally:
+            stop.set()
+
+    async def generate_response(self, context, user_query):
+        return "".join([chunk async for chunk in self.generate_stream(context, user_query)])
+
+
+class AsyncChatbot:
+    """asyncio-native chatbot that serves many conversations from one process.
+
+    Every request is bounded by `timeout` seconds and can be cancelled like
+    any other task. Use `conversation()` for multi-turn chats: each turn's
+    retrieval starts as soon as it is submitted, even while the previous
+    turn's answer is still streaming.
+    """
+
+    filtered_results = 20
+
+    def __init__(self, retriever, generator, timeout=30.0, country_index=None, planner=plan_query):
+        self.retriever = retriever
+        self.generator = generator
+        self.timeout = timeout
+        self.country_index = country_index
+        self.planner = planner
+
+    def prefetch(self, user_input):
+        """Start retrieval for a query in the background and return the task."""
+        where = None
+        if self.planner is not None:
+            entity_finder = self.country_index.mentioned if self.country_index is not None else None
+            where = self.planner(user_input, entity_finder)
+        if where is not None:
+            return asyncio.ensure_future(self.retriever.query(user_input, self.filtered_results, where))
+        return asyncio.ensure_future(self.retriever.query(user_input))
+
+    async def get_response_stream(self, user_input, retrieval=None, timeout=None, history=None):
+        deadline = asyncio.get_running_loop().time() + (timeout or self.timeout)
+
+        if self.country_index is not None:
+            response = self.country_index.answer(user_input)
+            if response is not None:
+                if retrieval is not None:
+                    retrieval.cancel()
+                yield response
+                return
+
+        if retrieval is None:
+            retrieval = self.prefetch(user_input)
+        results = await asyncio.wait_for(retrieval, self._remaining(deadline))
+        retrieved_docs = results['documents'], results['metadatas']
+
+        chunks = self.generator.generate_stream(retrieved_docs, user_input, history)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self._remaining(deadline))
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def get_response(self, user_input, timeout=None):
+        return "".join([chunk async for chunk in self.get_response_stream(user_input, timeout=timeout)])
+
+    def conversation(self, memory=None):
+        if memory is None:
+            entity_finder = self.country_index.mentioned if self.country_index is not None else None
+            memory = ConversationMemory(entity_finder=entity_finder)
+        return Conversation(self, memory)
+
+    @staticmethod
+    def _remaining(deadline):
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return remaining
+
+
+class Conversation:
+    """One chat session whose answers stream in turn order.
+
+    Follow-ups are rewritten with the conversation's memory before their
+    retrieval is started, and the recent turns are passed to the prompt.
+    A turn submitted while earlier ones are still answering is rewritten
+    again once they finish; if an earlier answer changed the country it
+    refers to, its retrieval is restarted with the new query.
+    """
+
+    def __init__(self, chatbot, memory=None):
+        self.chatbot = chatbot
+        self.memory = memory
+        self._turn = asyncio.Lock()
+
+    def ask_stream(self, user_input, timeout=None):
+        # Retrieval starts now; generation waits for the previous turn to finish
+        query = user_input
+        if self.memory is not None:
+            query = self.memory.rewrite(user_input)
+            self.memory.note_entity(user_input)
+        retrieval = self.chatbot.prefetch(query)
+        return self._stream(user_input, query, retrieval, timeout)
+
+    async def _stream(self, user_input, query, retrieval, timeout):
+        try:
+            async with self._turn:
+                history = None
+                if self.memory is not None:
+                    history = self.memory.context()
+                    resolved = self.memory.rewrite(user_input)
+                    if resolved != query:
+                        retrieval.cancel()
+                        query, retrieval = resolved, self.chatbot.prefetch(resolved)
+                chunks = []
+                async for chunk in self.chatbot.get_response_stream(query, retrieval, timeout, history):
+                    chunks.append(chunk)
+                    yield chunk
+                if self.memory is not None:
+                    self.memory.add_turn(user_input, "".join(chunks))
+        finally:
+            retrieval.cancel()  # no-op once it finished; stops it if the turn was abandoned
+
+    async def ask(self, user_input, timeout=None):
+        return "".join([chunk async for chunk in self.ask_stream(user_input, timeout)])
@@ -0,0 +1,98 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+STOPWORDS = frozenset(
+    "a an and are as at be by country countries for from how in is it its me of on or "
+    "tell that the to was what whats which who with".split()
+)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse several ranked lists of IDs into one, best first.
+
+    Each ID scores sum(1 / (k + rank)) over the lists it appears in.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking, start=1):
+            scores[row_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    """In-process BM25 inverted index over the collection's documents.
+
+    Country names and capitals are exact tokens, so lexical matching finds
+    them reliably and without an embedding call.
+    """
+
+    def __init__(self, ids=(), documents=(), k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.rebuild(ids, documents)
+
+    @classmethod
+    def from_index(cls, index):
+        """Build from every row of a collection or VectorIndex."""
+        stored = index.get(include=["documents"])
+        return cls(stored["ids"], stored["documents"])
+
+    def rebuild(self, ids, documents):
+        ids = list(ids)
+        postings = defaultdict(list)
+        lengths = []
+        for position, document in enumerate(documents):
+            tokens = tokenize(document)
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings[term].append((position, frequency))
+
+        count = len(ids)
+        idf = {
+            term: math.log(1.0 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in postings.items()
+        }
+        with self._lock:
+            self.ids = ids
+            self.postings = dict(postings)
+            self.idf = idf
+            self.lengths = lengths
+            self.average_length = (sum(lengths) / count) if count else 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, n_results=10):
+        """Return up to n_results (id, score) pairs, best first."""
+        with self._lock:
+            ids, postings, idf = self.ids, self.postings, self.idf
+            lengths, average_length = self.lengths, self.average_length
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            entries = postings.get(term)
+            if not entries:
+                continue
+            weight = idf[term]
+            for position, frequency in entries:
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[position] / average_length)
+                scores[position] += weight * frequency * (self.k1 + 1.0) / (frequency + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [(ids[position], score) for position, score in best]
+
+    def unambiguous_hit(self, query, margin=1.5):
+        """ID of the top lexical hit if it clearly beats the runner-up, else None."""
+        hits = self.search(query, 2)
+        if not hits:
+            return None
+        if len(hits) == 1 or hits[0][1] >= margin * hits[1][1]:
+            return hits[0][0]
+        return None
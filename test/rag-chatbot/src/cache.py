@@ -0,0 +1,95 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from tracing import tracer
+
+_MISSING = object()
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+def prompt_key(prompt, model):
+    """Key for a generated answer: the exact prompt sent and the model it was sent to."""
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize=1024, ttl=3600, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires = self._data.get(key, (_MISSING, 0))
+            if value is _MISSING or expires < time.monotonic():
+                if value is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                tracer.count(f"{self.name}.misses")
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            tracer.count(f"{self.name}.hits")
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RAGCache:
+    """Two-level cache for the RAG path.
+
+    Level one maps a normalized query to its retrieval results, level two maps
+    (prompt, model) to the generated answer. Call `invalidate()` whenever the
+    collection is refreshed so no answer outlives the data it was built from.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.retrievals = TTLCache(maxsize, ttl, name="retrieval_cache")
+        self.answers = TTLCache(maxsize, ttl, name="answer_cache")
+
+    def get_retrieval(self, query):
+        return self.retrievals.get(normalize_query(query))
+
+    def set_retrieval(self, query, results):
+        self.retrievals.set(normalize_query(query), results)
+
+    def get_answer(self, prompt, model):
+        return self.answers.get(prompt_key(prompt, model))
+
+    def set_answer(self, prompt, model, answer):
+        self.answers.set(prompt_key(prompt, model), answer)
+
+    def invalidate(self):
+        self.retrievals.clear()
+        self.answers.clear()
+
+    def stats(self):
+        return {
+            name: {"hits": level.hits, "misses": level.misses, "size": len(level)}
+            for name, level in (("retrievals", self.retrievals), ("answers", self.answers))
+        }
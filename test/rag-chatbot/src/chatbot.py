@@ -1,19 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from memory import ConversationMemory
+from planner import plan_query
+from sync import FINGERPRINT_KEY
+from tracing import tracer
+
 class Chatbot:
-    def __init__(self, retriever, generator):
+    filtered_results = 20  # rows retrieved for range queries, whose candidates are pre-filtered
+
+    def __init__(self, retriever, generator, cache=None, semantic_cache=None, country_index=None,
+                 planner=plan_query):
         self.retriever = retriever
         self.generator = generator
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.country_index = country_index
+        self.planner = planner
+
+    def new_memory(self, **kwargs):
+        """ConversationMemory that resolves follow-ups against this chatbot's countries."""
+        entity_finder = self.country_index.mentioned if self.country_index is not None else None
+        return ConversationMemory(entity_finder=entity_finder, **kwargs)
+
+    def get_response(self, user_input, memory=None):
+        return "".join(self.get_response_stream(user_input, memory))
+
+    def get_response_stream(self, user_input, memory=None):
+        # Yield the response in chunks as soon as they are available
+        if memory is None:
+            yield from self._answer_stream(user_input)
+            return
+        # Follow-ups are rewritten to name their subject, earlier turns go into the prompt
+        chunks = []
+        for chunk in self._answer_stream(memory.rewrite(user_input), memory.context()):
+            chunks.append(chunk)
+            yield chunk
+        memory.add_turn(user_input, "".join(chunks))
+
+    def _answer_stream(self, user_input, history=None):
+        if self.country_index is not None:
+            # Structured lookups ("capital of X", "top 10 by population") skip retrieval and the LLM
+            with tracer.span("structured_lookup"):
+                response = self.country_index.answer(user_input)
+            if response is not None:
+                tracer.count("structured.hits")
+                yield response
+                return
+
+        # Range questions ("population over 100 million") search only the matching rows
+        where = self._plan(user_input)
+        query_embedding = None
+        if self.semantic_cache is not None and where is None:
+            # Paraphrases of an earlier question reuse its answer without calling the LLM
+            query_embedding = self.retriever.embed(user_input)
+            response = self.semantic_cache.lookup(query_embedding, validate=self._sources_unchanged)
+            if response is not None:
+                yield response
+                return
+
+        results = self._retrieve(user_input, query_embedding, where)
+        yield from self._generate_stream(results, user_input, query_embedding, history)
+
+    def get_responses(self, user_inputs, max_workers=8):
+        """Answer many queries at once, e.g. for evaluation runs or cache pre-warming.
+
+        Queries are embedded in one batched call and searched in one index
+        query; generations then run concurrently on `max_workers` threads.
+        Returns the responses in input order.
+        """
+        user_inputs = list(user_inputs)
+        responses = [None] * len(user_inputs)
+        pending = []
+        for i, user_input in enumerate(user_inputs):
+            response = self.country_index.answer(user_input) if self.country_index is not None else None
+            if response is not None:
+                responses[i] = response
+            else:
+                pending.append(i)
+
+        # Range questions are retrieved one by one with their own filter
+        wheres = {i: self._plan(user_inputs[i]) for i in pending}
+        results = {i: self._retrieve(user_inputs[i], where=wheres[i]) for i in pending if wheres[i] is not None}
+        pending = [i for i in pending if wheres[i] is None]
+
+        embeddings = {}
+        if self.semantic_cache is not None and pending:
+            vectors = self.retriever.embed_many([user_inputs[i] for i in pending])
+            misses = []
+            for i, vector in zip(pending, vectors):
+                response = self.semantic_cache.lookup(vector, validate=self._sources_unchanged)
+                if response is not None:
+                    responses[i] = response
+                else:
+                    embeddings[i] = vector
+                    misses.append(i)
+            pending = misses
+
+        to_query = []
+        for i in pending:
+            cached = self.cache.get_retrieval(user_inputs[i]) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                to_query.append(i)
+        if to_query:
+            batch = self.retriever.query_many(
+                [user_inputs[i] for i in to_query],
+                query_embeddings=[embeddings[i] for i in to_query] if embeddings else None,
+            )
+            for i, result in zip(to_query, batch):
+                results[i] = result
+                if self.cache is not None:
+                    self.cache.set_retrieval(user_inputs[i], result)
+
+        def generate(i):
+            return "".join(self._generate_stream(results[i], user_inputs[i], embeddings.get(i)))
+
+        pending = sorted(results)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i, response in zip(pending, executor.map(generate, pending)):
+                responses[i] = response
+        return responses
+
+    def _plan(self, user_input):
+        if self.planner is None:
+            return None
+        entity_finder = self.country_index.mentioned if self.country_index is not None else None
+        return self.planner(user_input, entity_finder)
+
+    def _retrieve(self, user_input, query_embedding=None, where=None):
+        # The filter is part of the key: "over 5" and "> 5" normalize alike, "> 5" and "< 5" too
+        key = user_input if where is None else f"{user_input} {where}"
+        results = self.cache.get_retrieval(key) if self.cache is not None else None
+        if results is None:
+            with tracer.span("retrieve", filtered=where is not None):
+                if where is None:
+                    results = self.retriever.query(user_input, query_embedding=query_embedding)
+                else:
+                    results = self.retriever.query(user_input, self.filtered_results, query_embedding, where)
+            if self.cache is not None:
+                self.cache.set_retrieval(key, results)
+        return results
+
+    def _generate_stream(self, results, user_input, query_embedding=None, history=None):
+        retrieved_docs = results['documents'], results['metadatas']
+
+        prompt = None
+        if self.cache is not None:
+            prompt = self.generator.build_prompt(retrieved_docs, user_input, history)
+            response = self.cache.get_answer(prompt, self.generator.model)
+            if response is not None:
+                yield response
+                return
+
+        chunks = []
+        for chunk in self.generator.generate_stream(retrieved_docs, user_input, history):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+
+        if self.cache is not None:
+            self.cache.set_answer(prompt, self.generator.model, response)
+        if self.semantic_cache is not None and query_embedding is not None:
+            sources = {
+                row_id: (metadata or {}).get(FINGERPRINT_KEY)
+                for row_id, metadata in zip(results['ids'][0], results['metadatas'][0])
+            }
+            self.semantic_cache.add(query_embedding, response, sources)
 
-    def get_response(self, user_input):
-        retrieved_docs = self.retriever.retrieve(user_input)
-        response = self.generator.generate(retrieved_docs, user_input)
-        return response
+    def _sources_unchanged(self, sources):
+        return self.retriever.fingerprints(sources) == sources
 
     def chat(self):
         print("Welcome to the RAG Chatbot! Type 'exit' to end the conversation.")
+        memory = self.new_memory()
         while True:
             user_input = input("You: ")
             if user_input.lower() == 'exit':
                 print("Goodbye!")
                 break
-            response = self.get_response(user_input)
-            print(f"Chatbot: {response}")
\ No newline at end of file
+            print("Chatbot: ", end="", flush=True)
+            for chunk in self.get_response_stream(user_input, memory):
+                print(chunk, end="", flush=True)
+            print()
\ No newline at end of file
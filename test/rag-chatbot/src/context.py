@@ -0,0 +1,102 @@
+import re
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text):
+        """Number of tokens in text (tiktoken cl100k_base)."""
+        return len(_ENCODING.encode(text))
+
+    def truncate_tokens(text, max_tokens):
+        """The first max_tokens tokens of text."""
+        return _ENCODING.decode(_ENCODING.encode(text)[:max_tokens])
+except ImportError:
+    def count_tokens(text):
+        """Approximate number of tokens in text: words and punctuation marks."""
+        return len(_TOKEN.findall(text))
+
+    def truncate_tokens(text, max_tokens):
+        """The first max_tokens tokens of text (words and punctuation marks)."""
+        matches = list(_TOKEN.finditer(text))
+        if len(matches) <= max_tokens:
+            return text
+        return text[:matches[max_tokens - 1].end()] if max_tokens > 0 else ""
+
+
+def _shingles(text):
+    return frozenset(token.lower() for token in _TOKEN.findall(text) if token.isalnum())
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ContextBuilder:
+    """Pack retrieved chunks into a compact, token-budgeted prompt context.
+
+    Chunks are taken best first (in the order given, or by ascending
+    distance if `distances` are passed), near-duplicates are dropped, and
+    rows are added until `max_tokens` is reached; a first row that does not
+    fit on its own is truncated rather than dropped. When metadata is available
+    the rows are rendered as a pipe-separated table, which is far shorter
+    than the prose documents.
+    """
+
+    def __init__(self, max_tokens=512, duplicate_threshold=0.9, fields=None):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.fields = fields
+
+    def _fields(self, metadatas):
+        if self.fields:
+            return list(self.fields)
+        fields = []
+        for metadata in metadatas:
+            for key in metadata or {}:
+                if not key.startswith("_") and key not in fields:
+                    fields.append(key)
+        return fields
+
+    def build(self, documents, metadatas=None, distances=None):
+        documents = list(documents)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(documents)
+        order = range(len(documents))
+        if distances is not None:
+            order = sorted(order, key=lambda i: distances[i])
+
+        fields = self._fields(metadatas) if all(metadatas) and metadatas else []
+        header = " | ".join(fields) if fields else None
+
+        def render(i):
+            if fields:
+                return " | ".join(str(metadatas[i].get(field, "")) for field in fields)
+            return f"- {documents[i]}"
+
+        lines = [header] if header else []
+        used = count_tokens(header) if header else 0
+        kept = []
+        for i in order:
+            line = render(i)
+            shingles = _shingles(line)
+            if any(jaccard(shingles, other) >= self.duplicate_threshold for other in kept):
+                continue
+            cost = count_tokens(line) + 1  # plus the newline
+            if used + cost > self.max_tokens:
+                if not kept:
+                    # Better part of the best row than an empty context
+                    lines.append(truncate_tokens(line, max(self.max_tokens - used - 1, 1)))
+                    kept.append(shingles)
+                break
+            lines.append(line)
+            kept.append(shingles)
+            used += cost
+
+        if not kept:
+            return ""
+        return "\n".join(lines)
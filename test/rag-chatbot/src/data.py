@@ -1,61 +1,42 @@
-import requests
-from bs4 import BeautifulSoup
-import chromadb
-from chromadb.config import Settings
 import chromadb.utils.embedding_functions as embedding_functions
+from embedding_cache import CachedEmbeddingFunction
+from extractor import extract_countries
+from fetcher import PageFetcher
+from ingest import IngestPipeline
+from store import load_store_config, open_collection, prune_snapshots, write_snapshot
+from sync import sync_records
 
 # Step 1: Scrape data from the URL
-url = "https://www.scrapethissite.com/pages/simple/"
-response = requests.get(url)
-soup = BeautifulSoup(response.text, 'html.parser')
+urls = ["https://www.scrapethissite.com/pages/simple/"]
 
-# Extract data (e.g., country names and details)
-countries = []
-for country_div in soup.find_all('div', class_='country'):
-    # Extract country details
-    countries.append({
-        "name": country_div.find('h3', class_='country-name').text.strip(),
-        "capital": country_div.find('span', class_='country-capital').text.strip(),
-        "population": country_div.find('span', class_='country-population').text.strip(),
-        "area": country_div.find('span', class_='country-area').text.strip()
-    })
-
-# Initialize ChromaDB client
-client = chromadb.Client()
+# Store settings (paths, collection name, API keys) come from config.json
+config = load_store_config("config.json")
 
 # Use embedding function
-google_ef = embedding_functions.GoogleGenerativeAiEmbeddingFunction(api_key="YOUR_API_KEY")
-collection = client.create_collection(name="countries", embedding_function=google_ef)
-
-# Prepare data for insertion
-documents = []
-metadatas = []
-ids = []
-
-for i, country in enumerate(countries):
-    # Create a text representation of the country for the document
-    country_text = f"Country: {country['name']}, Capital: {country['capital']}, Population: {country['population']}, Area: {country['area']}"
-    documents.append(country_text)
-    
-    # Store the original data as metadata
-    metadatas.append({
-        "name": country["name"],
-        "capital": country["capital"],
-        "population": country["population"],
-        "area": country["area"]
-    })
-    
-    # Create a unique ID for each entry
-    ids.append(f"country_{i}")
-
-# Add all countries to ChromaDB at once
-collection.add(
-    documents=documents,
-    metadatas=metadatas,
-    ids=ids
-)
-
-print(f"Successfully stored {len(countries)} countries in ChromaDB!")
+google_ef = embedding_functions.GoogleGenerativeAiEmbeddingFunction(api_key=config.get("google_api_key", "YOUR_API_KEY"))
+# Cache embeddings on disk so unchanged documents are never re-embedded
+google_ef = CachedEmbeddingFunction(google_ef)
+
+# Open the persistent collection so the data survives restarts
+collection, startup_seconds = open_collection({**config, "use_snapshot": False}, google_ef)
+print(f"Opened collection '{config['collection_name']}' in {startup_seconds * 1000:.0f} ms")
+
+# Pages are fetched concurrently over a pooled session and parsed as they arrive;
+# rows are keyed by a stable per-country ID and only those whose content changed
+# since the last run are embedded, in concurrent batches written as they finish.
+# An interrupted run resumes on its own: rows already written match their fingerprints
+pipeline = IngestPipeline(collection, google_ef)
+with PageFetcher() as fetcher:
+    changes, (documents, metadatas, ids) = sync_records(
+        collection, fetcher.stream_records(urls, extract_countries), pipeline=pipeline
+    )
+
+print(f"Successfully stored {len(ids)} countries in ChromaDB: {changes}")
+print(f"Embedding cache: {google_ef.stats()}")
+
+# Publish a read-only snapshot that fresh workers can load without opening Chroma
+print(f"Wrote snapshot {write_snapshot(collection, config['snapshot_directory'])}")
+prune_snapshots(config['snapshot_directory'], keep=3)
 
 # Example query to verify the data is stored
 result = collection.query(
@@ -0,0 +1,163 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+
+from tracing import tracer
+
+try:
+    from chromadb.api.types import EmbeddingFunction
+except ImportError:  # chromadb is only needed when the cache is handed to a collection
+    EmbeddingFunction = object
+
+
+def embedding_key(model_name, text):
+    """Content-address a text for a given embedding model."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Wrap an embedding function with a SQLite cache keyed by hash(model + text).
+
+    Only texts that are not already cached are sent to the wrapped function, so
+    re-ingesting unchanged documents makes no embedding calls at all.
+    """
+
+    def __init__(self, embedding_function, path="embedding_cache.sqlite3",
+                 model_name=None, max_entries=100_000, touch_interval=60.0):
+        self.embedding_function = embedding_function
+        self.model_name = model_name or getattr(embedding_function, "_model_name", None) \
+            or type(embedding_function).__name__
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Hits only bump last_used in memory; the timestamps are written in one
+        # transaction every `touch_interval` seconds (or with the next insert),
+        # so serving from the cache never waits on the database write lock
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets server workers sharing the file read while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def __call__(self, input):
+        texts = list(input)
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        vectors = self._lookup(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in vectors]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        tracer.count("embedding_cache.hits", len(texts) - len(missing))
+        tracer.count("embedding_cache.misses", len(missing))
+
+        if missing:
+            # Embed each distinct missing text once, even if it repeats in the batch
+            pending = {}
+            for i in missing:
+                pending.setdefault(keys[i], texts[i])
+            with tracer.span("embed_remote", batch=len(pending)):
+                fresh = self.embedding_function(list(pending.values()))
+            new_vectors = {key: [float(x) for x in vector]
+                           for key, vector in zip(pending, fresh)}
+            self._store(new_vectors)
+            vectors.update(new_vectors)
+
+        return [vectors[key] for key in keys]
+
+    def _lookup(self, keys):
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            for key in found:
+                self._touched[key] = now
+            if time.monotonic() - self._last_flush >= self.touch_interval:
+                self._flush_touched()
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors):
+        now = time.time()
+        with self._lock:
+            # Keys are content hashes, so a key written meanwhile by another
+            # process already holds the same vector
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in vectors.items()],
+            )
+            self._size += max(cursor.rowcount, 0)
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched = {}
+        self._last_flush = time.monotonic()
+
+    def _evict(self):
+        """Drop the least recently used entries once the size bound is exceeded."""
+        if self._size <= self.max_entries:
+            return
+        # The running size misses rows added by other processes; recount only
+        # when it says the bound is exceeded, then trim 10% below the bound so
+        # the next few inserts do not trigger another eviction
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = self._size - (self.max_entries - self.max_entries // 10)
+        if self._size > self.max_entries and excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            self._size -= excess
+
+    def stats(self):
+        """Return hit/miss counters and the current number of cached vectors."""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": size,
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,103 @@
+"""Extract country records from scrapethissite-style HTML.
+
+Three interchangeable backends are available. selectolax and lxml are used
+when installed, with their selectors compiled once at import time, and
+BeautifulSoup is the always-available fallback.
+"""
+
+FIELDS = (
+    ("name", "h3", "country-name"),
+    ("capital", "span", "country-capital"),
+    ("population", "span", "country-population"),
+    ("area", "span", "country-area"),
+)
+
+
+def _class_xpath(tag, class_name, prefix=""):
+    return f"{prefix}{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+def _bs4_rows(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for country_div in soup.find_all("div", class_="country"):
+        row = {}
+        for field, tag, class_name in FIELDS:
+            node = country_div.find(tag, class_=class_name)
+            row[field] = node.text.strip() if node is not None else None
+        yield row
+
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+
+    _LXML_COUNTRIES = etree.XPath(_class_xpath("div", "country", prefix="//"))
+    _LXML_FIELDS = [
+        (field, etree.XPath(_class_xpath(tag, class_name, prefix=".//")))
+        for field, tag, class_name in FIELDS
+    ]
+
+    def _lxml_rows(html):
+        try:
+            root = lxml_html.fromstring(html)
+        except (etree.ParserError, ValueError):
+            # Empty pages, and str pages with an XML encoding declaration,
+            # which lxml refuses; bs4 handles both
+            yield from _bs4_rows(html)
+            return
+        for country_div in _LXML_COUNTRIES(root):
+            row = {}
+            for field, selector in _LXML_FIELDS:
+                nodes = selector(country_div)
+                row[field] = nodes[0].text_content().strip() if nodes else None
+            yield row
+except ImportError:
+    _lxml_rows = None
+
+
+try:
+    from selectolax.parser import HTMLParser
+
+    _SELECTOLAX_FIELDS = [(field, f"{tag}.{class_name}") for field, tag, class_name in FIELDS]
+
+    def _selectolax_rows(html):
+        tree = HTMLParser(html)
+        for country_div in tree.css("div.country"):
+            row = {}
+            for field, selector in _SELECTOLAX_FIELDS:
+                node = country_div.css_first(selector)
+                row[field] = node.text(strip=True) if node is not None else None
+            yield row
+except ImportError:
+    _selectolax_rows = None
+
+
+BACKENDS = {
+    name: rows
+    for name, rows in (("selectolax", _selectolax_rows), ("lxml", _lxml_rows), ("bs4", _bs4_rows))
+    if rows is not None
+}
+
+
+def default_backend():
+    """Name of the fastest installed backend."""
+    return next(iter(BACKENDS))
+
+
+def extract_countries(html, backend=None, on_missing=None):
+    """Return the list of country dicts found in the page.
+
+    Rows with a missing field are skipped; `on_missing` is called with the
+    partial row for each of them.
+    """
+    rows = BACKENDS[backend or default_backend()]
+    countries = []
+    for row in rows(html):
+        if None in row.values():
+            if on_missing is not None:
+                on_missing(row)
+            continue
+        countries.append(row)
+    return countries
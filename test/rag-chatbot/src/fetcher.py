@@ -0,0 +1,82 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+Page = namedtuple("Page", ["url", "status_code", "text", "not_modified"])
+
+
+class PageFetcher:
+    """Fetch many pages concurrently over a pooled keep-alive session.
+
+    Failed requests are retried with exponential backoff and pages that were
+    fetched before are revalidated with conditional GETs (ETag/Last-Modified),
+    so an unchanged page costs a 304 instead of a full download.
+    """
+
+    def __init__(self, max_workers=8, retries=3, backoff_factor=0.5, timeout=10, session=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._validators = {}  # url -> (etag, last_modified, text)
+
+    def fetch(self, url):
+        """Fetch a single page, returning the cached body if the server says 304."""
+        headers = {}
+        with self._lock:
+            cached = self._validators.get(url)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            return Page(url, response.status_code, cached[2], True)
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self._validators[url] = (etag, last_modified, response.text)
+        return Page(url, response.status_code, response.text, False)
+
+    def fetch_all(self, urls):
+        """Yield pages in completion order, with at most max_workers requests in flight."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch, url) for url in urls]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def stream_records(self, urls, parse):
+        """Yield parsed records as soon as each page arrives.
+
+        `parse` takes the page HTML and returns an iterable of records.
+        """
+        for page in self.fetch_all(urls):
+            yield from parse(page.text)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,15 +1,150 @@
-import openai
+import asyncio
+import time
+from abc import ABC, abstractmethod
+
+from context import ContextBuilder, count_tokens
+from tracing import tracer
+
+
+class LLMBackend(ABC):
+    """Interface for text generation backends.
+
+    Subclasses implement `stream()`, yielding text chunks as they arrive;
+    `complete()` joins them unless a backend has a cheaper blocking call.
+    """
+
+    model_name = None
+
+    @abstractmethod
+    def stream(self, prompt):
+        """Yield the completion of `prompt` in chunks as they arrive."""
+
+    def complete(self, prompt):
+        return "".join(self.stream(prompt))
+
+
+class OpenAIBackend(LLMBackend):
+    def __init__(self, api_key, model="gpt-3.5-turbo"):
+        import openai
 
-class ResponseGenerator:
-    def __init__(self, api_key):
         openai.api_key = api_key
+        self._openai = openai
+        self.model_name = model
 
-    def generate_response(self, context, user_query):
-        prompt = f"Context: {context}\nUser: {user_query}\nChatbot:"
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+    def complete(self, prompt):
+        response = self._openai.ChatCompletion.create(
+            model=self.model_name,
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
-        return response['choices'][0]['message']['content'].strip()
\ No newline at end of file
+        return response['choices'][0]['message']['content'].strip()
+
+    def stream(self, prompt):
+        response = self._openai.ChatCompletion.create(
+            model=self.model_name,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            stream=True
+        )
+        for chunk in response:
+            content = chunk['choices'][0]['delta'].get('content')
+            if content:
+                yield content
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, model):
+        # `model` is a configured google.generativeai.GenerativeModel
+        self.model = model
+        self.model_name = model.model_name
+
+    def complete(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend(LLMBackend):
+    """Local stand-in model for tests and benchmarks.
+
+    Streams `reply` (a string, or a callable taking the prompt) in chunks of
+    `chunk_size` characters, sleeping `first_token_latency` before the first
+    chunk and `chunk_latency` before each following one. `astream()` does the
+    same without blocking the event loop.
+    """
+
+    def __init__(self, reply="This is a test answer.", chunk_size=4,
+                 first_token_latency=0.0, chunk_latency=0.0, model_name="fake"):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.first_token_latency = first_token_latency
+        self.chunk_latency = chunk_latency
+        self.model_name = model_name
+
+    def stream(self, prompt):
+        text = self.reply(prompt) if callable(self.reply) else self.reply
+        for start in range(0, len(text), self.chunk_size):
+            delay = self.first_token_latency if start == 0 else self.chunk_latency
+            if delay:
+                time.sleep(delay)
+            yield text[start:start + self.chunk_size]
+
+    async def astream(self, prompt):
+        text = self.reply(prompt) if callable(self.reply) else self.reply
+        for start in range(0, len(text), self.chunk_size):
+            delay = self.first_token_latency if start == 0 else self.chunk_latency
+            if delay:
+                await asyncio.sleep(delay)
+            yield text[start:start + self.chunk_size]
+
+
+class ResponseGenerator:
+    def __init__(self, api_key=None, model="gpt-3.5-turbo", backend=None, context_builder=None):
+        self.backend = backend or OpenAIBackend(api_key, model)
+        self.model = self.backend.model_name
+        self.context_builder = context_builder or ContextBuilder()
+
+    def build_prompt(self, context, user_query, history=None):
+        if isinstance(context, tuple):
+            # (documents, metadatas) from Retriever.retrieve, one nested list per query
+            documents, metadatas = context
+            context = self.context_builder.build(
+                documents[0] if documents else [], metadatas[0] if metadatas else None
+            )
+        if history:
+            return f"Context:\n{context}\nConversation so far:\n{history}\nUser: {user_query}\nChatbot:"
+        return f"Context:\n{context}\nUser: {user_query}\nChatbot:"
+
+    def generate_response(self, context, user_query, history=None):
+        prompt = self.build_prompt(context, user_query, history)
+        if not tracer.enabled:
+            return self.backend.complete(prompt)
+        tracer.count("tokens.prompt", count_tokens(prompt))
+        with tracer.span("generate", model=self.model):
+            response = self.backend.complete(prompt)
+        tracer.count("tokens.completion", count_tokens(response))
+        return response
+
+    def generate_stream(self, context, user_query, history=None):
+        # Yield the answer chunk by chunk as the model produces it
+        prompt = self.build_prompt(context, user_query, history)
+        if not tracer.enabled:
+            return self.backend.stream(prompt)
+        return self._traced_stream(prompt)
+
+    def _traced_stream(self, prompt):
+        tracer.count("tokens.prompt", count_tokens(prompt))
+        with tracer.span("generate", model=self.model):
+            start = time.perf_counter()
+            first = True
+            for chunk in self.backend.stream(prompt):
+                if first:
+                    tracer.observe("generate_first_token", time.perf_counter() - start)
+                    first = False
+                tracer.count("tokens.completion", count_tokens(chunk))
+                yield chunk
\ No newline at end of file
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class RateLimiter:
+    """Space calls so that at most `rate` of them start per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class IngestMetrics:
+    """Progress and throughput of an ingest run."""
+
+    def __init__(self, total_rows):
+        self.total_rows = total_rows
+        self.rows_done = 0
+        self.batches_done = 0
+        self.batches_skipped = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self):
+        elapsed = self.elapsed
+        return self.rows_done / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "total_rows": self.total_rows,
+            "rows_done": self.rows_done,
+            "batches_done": self.batches_done,
+            "batches_skipped": self.batches_skipped,
+            "elapsed": round(self.elapsed, 3),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+        }
+
+
+def batch_key(documents, ids):
+    """Identify a batch by its content so a checkpoint never skips changed rows."""
+    digest = hashlib.sha256()
+    for row_id, document in zip(ids, documents):
+        digest.update(row_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(document.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IngestPipeline:
+    """Embed rows in batches on a worker pool and write them to ChromaDB as they finish.
+
+    Only a bounded number of batches is in flight at once, so memory stays
+    flat regardless of corpus size. Finished batches are recorded in a
+    checkpoint file; rerunning after a crash into the same collection skips
+    them, as long as their rows are still in the store. The checkpoint is
+    removed once a run completes.
+    """
+
+    def __init__(self, collection, embedding_function, batch_size=100, max_workers=4,
+                 requests_per_second=None, checkpoint_path=None):
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.checkpoint_path = checkpoint_path
+        self.metrics = None
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r") as file:
+                checkpoint = json.load(file)
+            # A checkpoint left by a run into another collection says nothing about this one
+            if checkpoint.get("collection") == self.collection.name:
+                return set(checkpoint["done"])
+        return set()
+
+    def _save_checkpoint(self, done):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"collection": self.collection.name, "done": sorted(done)}, file)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _stored(self, ids):
+        """True if every id is in the collection, so a checkpointed batch can be skipped."""
+        return len(self.collection.get(ids=ids, include=[])["ids"]) == len(ids)
+
+    def _batches(self, documents, metadatas, ids):
+        for start in range(0, len(ids), self.batch_size):
+            end = start + self.batch_size
+            yield documents[start:end], metadatas[start:end], ids[start:end]
+
+    def _embed(self, documents):
+        self.rate_limiter.wait()
+        return self.embedding_function(documents)
+
+    def run(self, documents, metadatas, ids, progress=None):
+        """Ingest the rows and return the final metrics.
+
+        `progress` is called with the metrics after every written batch.
+        """
+        return self.run_batches([(documents, metadatas, ids)], progress, total_rows=len(ids))
+
+    def run_batches(self, batches, progress=None, total_rows=None):
+        """Ingest rows that arrive as (documents, metadatas, ids) batches and return the final metrics.
+
+        `batches` may be a generator fed by a scrape that is still running:
+        each batch is embedded as soon as it arrives, and finished batches
+        are written while waiting for the next one. Without `total_rows`,
+        the metrics count the rows seen so far.
+        """
+        self.metrics = metrics = IngestMetrics(total_rows or 0)
+        done = self._load_checkpoint()
+        max_in_flight = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+
+            def drain(timeout=None):
+                finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key, batch_docs, batch_metas, batch_ids = in_flight.pop(future)
+                    # Writes happen on this thread, only embedding runs on the pool
+                    self.collection.upsert(
+                        documents=batch_docs,
+                        metadatas=batch_metas,
+                        embeddings=future.result(),
+                        ids=batch_ids,
+                    )
+                    done.add(key)
+                    self._save_checkpoint(done)
+                    metrics.rows_done += len(batch_ids)
+                    metrics.batches_done += 1
+                    if progress is not None:
+                        progress(metrics)
+
+            for documents, metadatas, ids in batches:
+                if total_rows is None:
+                    metrics.total_rows += len(ids)
+                for batch_docs, batch_metas, batch_ids in self._batches(documents, metadatas, ids):
+                    key = batch_key(batch_docs, batch_ids)
+                    if key in done and self._stored(batch_ids):
+                        metrics.rows_done += len(batch_ids)
+                        metrics.batches_skipped += 1
+                        continue
+                    if len(in_flight) >= max_in_flight:
+                        drain()
+                    future = executor.submit(self._embed, batch_docs)
+                    in_flight[future] = (key, batch_docs, batch_metas, batch_ids)
+                if in_flight:
+                    drain(timeout=0)  # write whatever finished before waiting for the next batch
+
+            while in_flight:
+                drain()
+
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return metrics
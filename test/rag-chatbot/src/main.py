@@ -1,9 +1,65 @@
-import time
+import chromadb.utils.embedding_functions as embedding_functions
+
+from bm25 import BM25Index
+from cache import RAGCache
 from chatbot import Chatbot
+from embedding_cache import CachedEmbeddingFunction
+from generator import ResponseGenerator
+from rerank import make_reranker
+from retriever import Retriever
+from semantic_cache import SemanticCache
+from store import load_store_config, open_collection
+from structured import CountryIndex
+from vector_index import NumpyIndex
+
+def build_embedding_function(config):
+    return CachedEmbeddingFunction(
+        embedding_functions.GoogleGenerativeAiEmbeddingFunction(api_key=config.get("google_api_key"))
+    )
+
+def load_indexes(config, embedding_function=None):
+    """Open the vector store and build the read-only indexes the chatbot searches.
+
+    Returns (index, lexical_index, country_index). They hold no clients of
+    their own once built with the numpy backend, so the server loads them
+    once and shares them with its forked workers.
+    """
+    # Reads are served from the persistent store (or a prebuilt snapshot) right away
+    collection, startup_seconds = open_collection(config, embedding_function)
+    print(f"Vector store ready in {startup_seconds * 1000:.0f} ms ({collection.count()} rows)")
+
+    index = collection
+    if config["index_backend"] == "numpy" and not isinstance(collection, NumpyIndex):
+        # Search an in-process copy of the collection instead of going through Chroma
+        index = NumpyIndex.from_collection(collection, embedding_function)
+
+    # BM25 over the same rows, fused with vector search (see "retrieval_mode")
+    lexical_index = BM25Index.from_index(index) if config["retrieval_mode"] != "vector" else None
+    return index, lexical_index, CountryIndex.from_collection(index)
+
+def build_semantic_cache(config):
+    """SemanticCache for paraphrased questions if "semantic_cache" is enabled, else None."""
+    if not config["semantic_cache"]:
+        return None
+    return SemanticCache(threshold=config["semantic_cache_threshold"])
+
+def build_chatbot(config_file="config.json", indexes=None):
+    config = load_store_config(config_file)
+    google_ef = build_embedding_function(config)
+    index, lexical_index, country_index = indexes or load_indexes(config, google_ef)
+
+    return Chatbot(
+        Retriever(index, google_ef, lexical_index, mode=config["retrieval_mode"],
+                  reranker=make_reranker(config["reranker"])),
+        ResponseGenerator(config.get("openai_api_key")),
+        cache=RAGCache(),
+        semantic_cache=build_semantic_cache(config),
+        country_index=country_index,
+    )
 
 def main():
     # Initialize the chatbot
-    chatbot = Chatbot()
+    chatbot = build_chatbot()
 
     print("Welcome to the RAG Chatbot! Type 'exit' to end the conversation.")
     
@@ -20,7 +76,6 @@ def main():
         
         # Print the chatbot's response
         print(f"Chatbot: {response}")
-        time.sleep(1)  # Optional: add a delay for a more natural conversation flow
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,169 @@
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import normalize_query
+from context import count_tokens
+from tracing import tracer
+
+# Words that point back at something said earlier ("and its capital?")
+REFERENCE_WORDS = {"it", "its", "they", "their", "them", "theirs", "same"}
+_FOLLOW_UP = re.compile(r"^(and|also|what about|how about)\b")
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+# One background thread folds evicted turns into summaries for every conversation
+_SUMMARIZER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+
+def _first_sentence(text, max_chars=160):
+    sentence = _SENTENCE.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rstrip() + "..."
+
+
+def extractive_summary(summary, turns, max_tokens=150):
+    """Fold `turns` into `summary` without a model call.
+
+    Each turn becomes "question -> first sentence of the answer"; the oldest
+    entries are dropped once the summary exceeds `max_tokens`.
+    """
+    entries = [entry for entry in summary.split("\n") if entry]
+    entries.extend(f"{user} -> {_first_sentence(assistant)}" for user, assistant in turns)
+    while len(entries) > 1 and count_tokens("\n".join(entries)) > max_tokens:
+        entries.pop(0)
+    return "\n".join(entries)
+
+
+def llm_summarizer(backend, max_words=80):
+    """Build a summarize(summary, turns) callable that asks an LLMBackend to condense the history."""
+    def summarize(summary, turns):
+        transcript = "\n".join(f"User: {user}\nChatbot: {assistant}" for user, assistant in turns)
+        prompt = (
+            f"Summarize this conversation in at most {max_words} words, keeping every "
+            f"country and number that was mentioned.\n\n"
+            f"Earlier summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\nSummary:"
+        )
+        return backend.complete(prompt).strip()
+    return summarize
+
+
+class ConversationMemory:
+    """Bounded memory of one multi-turn conversation.
+
+    The last `max_turns` (user, assistant) turns are kept verbatim in a ring
+    buffer. Turns pushed out of it are folded into a rolling summary by
+    `summarize(summary, turns)` on a background thread, so answering never
+    waits for summarization. `rewrite()` resolves follow-ups such as "and
+    its capital?" against the last country mentioned, found with
+    `entity_finder(text)`. `context()` renders the summary and recent turns
+    for the prompt within a fixed token budget, so prompt size stays
+    constant however long the chat gets.
+    """
+
+    def __init__(self, max_turns=6, max_tokens=300, summarize=None, entity_finder=None, executor=None):
+        self.max_tokens = max_tokens
+        self.summarize = summarize or extractive_summary
+        self.entity_finder = entity_finder
+        self.executor = executor or _SUMMARIZER
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.last_entity = None
+        self._evicted = []
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def _find_entity(self, text):
+        return self.entity_finder(text) if self.entity_finder is not None and text else None
+
+    def rewrite(self, query):
+        """Make a follow-up self-contained by naming the entity it refers to."""
+        if self.last_entity is None or self._find_entity(query) is not None:
+            return query
+        text = normalize_query(query)
+        if set(text.split()) & REFERENCE_WORDS or _FOLLOW_UP.match(text):
+            return f"{query.rstrip()} ({self.last_entity})"
+        return query
+
+    def note_entity(self, user):
+        """Remember the country a question names before its answer arrives.
+
+        A follow-up submitted while that question is still being answered
+        (see `async_chatbot.Conversation`) then resolves against it.
+        """
+        entity = self._find_entity(user)
+        if entity is not None:
+            with self._lock:
+                self.last_entity = entity
+
+    def add_turn(self, user, assistant):
+        entity = self._find_entity(user) or self._find_entity(assistant)
+        with self._lock:
+            if entity is not None:
+                self.last_entity = entity
+            if len(self.turns) == self.turns.maxlen:
+                self._evicted.append(self.turns[0])
+            self.turns.append((user, assistant))
+            if self._evicted and self._pending is None:
+                self._pending = self.executor.submit(self._fold)
+
+    def _fold(self):
+        evicted = []
+        try:
+            while True:
+                with self._lock:
+                    evicted, self._evicted = self._evicted, []
+                    summary = self.summary
+                    if not evicted:
+                        return
+                summary = self.summarize(summary, evicted)
+                with self._lock:
+                    self.summary = summary
+                evicted = []
+        except Exception:
+            # Fold with the extractive summary instead, so a summarizer that is
+            # down neither loses turns nor lets them pile up
+            tracer.count("memory.summarize_errors")
+            with self._lock:
+                self.summary = extractive_summary(self.summary, evicted + self._evicted)
+                self._evicted = []
+        finally:
+            with self._lock:
+                self._pending = None
+                if self._evicted:
+                    # Turns evicted after the last check, or while falling back
+                    self._pending = self.executor.submit(self._fold)
+
+    def flush(self):
+        """Wait until every evicted turn has been folded into the summary."""
+        pending = self._pending
+        while pending is not None:
+            pending.result()
+            pending = self._pending
+
+    def context(self):
+        """Summary plus as many recent turns as fit in `max_tokens`, oldest dropped first."""
+        with self._lock:
+            summary = self.summary
+            turns = list(self.turns)
+        lines = [f"User: {user}\nChatbot: {assistant}" for user, assistant in turns]
+        header = f"Summary of earlier turns:\n{summary}" if summary else None
+        used = count_tokens(header) if header else 0
+        kept = []
+        for line in reversed(lines):
+            cost = count_tokens(line)
+            if used + cost > self.max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        parts = ([header] if header else []) + kept[::-1]
+        return "\n".join(parts)
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+            self._evicted = []
+            self.summary = ""
+            self.last_entity = None
+
+    def __len__(self):
+        return len(self.turns)
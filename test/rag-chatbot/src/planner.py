@@ -0,0 +1,172 @@
+import re
+from collections import namedtuple
+
+from structured import AREA_WORDS, POPULATION_WORDS
+
+Constraint = namedtuple("Constraint", ["field", "op", "value"])
+
+_SCALES = {
+    "thousand": 1e3, "k": 1e3,
+    "million": 1e6, "mn": 1e6, "m": 1e6,
+    "billion": 1e9, "bn": 1e9, "b": 1e9,
+}
+_OPERATORS = [
+    (("at least", "no less than", ">="), "$gte"),
+    (("at most", "no more than", "up to", "<="), "$lte"),
+    (("more than", "greater than", "larger than", "bigger than", "higher than", "in excess of",
+      "over", "above", "exceeding", ">"), "$gt"),
+    (("less than", "fewer than", "smaller than", "lower than", "under", "below", "<"), "$lt"),
+]
+_OPERATOR_OF = {phrase: op for phrases, op in _OPERATORS for phrase in phrases}
+_SIZE_COMPARATORS = {"larger than", "bigger than", "smaller than"}
+_AREA_UNIT_WORDS = {"km", "kilometers", "kilometres"}
+# Words that never own a number, skipped when looking for the noun a number belongs to
+_FILLER = {
+    "a", "an", "the", "of", "with", "has", "have", "having", "is", "are", "was", "were", "be",
+    "than", "that", "which", "who", "whose", "where", "its", "their", "total", "all", "any",
+    "country", "countries", "nation", "nations", "state", "states", "list", "show", "me", "find",
+}
+_CONJUNCTIONS = {"and", "but", "or", "while"}
+# Words after a number that start a new phrase rather than name what it counts
+# ("over 100 million in asia", "above 50 million please")
+_NOT_A_NOUN = _CONJUNCTIONS | {
+    "in", "on", "at", "of", "for", "from", "to", "by", "with", "within", "across", "among", "around",
+    "as", "than", "please", "only", "now", "today", "currently", "worldwide", "globally",
+}
+
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?)\s*(thousand|million|billion|mn|bn|[kmb]\b)?"
+_UNIT = r"\s*(km²|km2|km\b|sq\.?\s*km|square\s+kilomet(?:er|re)s?)?"
+_COMPARISON = re.compile(
+    r"(?<![\w<>=])("
+    + "|".join(re.escape(phrase) for phrase in sorted(_OPERATOR_OF, key=len, reverse=True))
+    + r")\s*" + _NUMBER + _UNIT
+)
+_OR_MORE = re.compile(
+    r"(?<![\w.,])" + _NUMBER + _UNIT + r"((?:\s+[a-z]+){0,2}?)\s+or\s+(more|greater|higher|less|fewer|lower)\b"
+)
+_BETWEEN = re.compile(r"\bbetween\s+" + _NUMBER + r"\s+and\s+" + _NUMBER + _UNIT)
+_SKIP = object()  # the number belongs to some other noun ("2 languages", "GDP over 1 trillion")
+
+
+def _number(digits, scale):
+    value = float(digits.replace(",", "")) * _SCALES.get(scale or "", 1)
+    return int(value) if value.is_integer() else value
+
+
+def _word_field(word):
+    if word in POPULATION_WORDS:
+        return "population"
+    if word in AREA_WORDS or word in _AREA_UNIT_WORDS:
+        return "area"
+    return _SKIP
+
+
+def _noun_after(text):
+    # The noun right after a number names what it counts: "100 million people",
+    # "2 official languages"; "100 people per km2" is a rate, not a count
+    words = re.match(r"\s*([a-z]+)?(?:\s+([a-z]+))?", text).groups()
+    if words[0] is None or words[0] in _NOT_A_NOUN:
+        return None
+    field = _word_field(words[0])
+    if field is not _SKIP and words[1] == "per":
+        return _SKIP
+    return field
+
+
+def _noun_before(text):
+    # The nearest noun before the comparison, within the clause: "population
+    # over 10m" but "GDP over 1 trillion" and "population of France over 70m"
+    words = [word for word in re.findall(r"[a-z]+", text) if word not in _FILLER]
+    if not words:
+        return None
+    if words[-1] in _CONJUNCTIONS:
+        return None
+    return _word_field(words[-1])
+
+
+def _field(before, after, unit, comparator=None, previous=None):
+    if unit:
+        return "area"
+    field = _noun_after(after)
+    if field is None:
+        field = _noun_before(before)
+    if field is None and comparator in _SIZE_COMPARATORS:
+        field = "area"
+    if field is None and re.fullmatch(r"[\s,]*(?:and|but)?[\s,]*", before):
+        # "population over 1m and under 5m": the second bound shares the first one's field
+        field = previous
+    return None if field is _SKIP else field
+
+
+def extract_constraints(query):
+    """Numeric constraints on population and area stated in a question.
+
+    "population over 100 million" gives [Constraint("population", "$gt",
+    100000000)]; "between 1 and 2 million people" gives a $gte and a $lte.
+    A number is only used when the noun it belongs to, right after it or
+    just before the comparison, is a population or area word: "more than 2
+    languages" and "GDP over 1 trillion" are skipped.
+    """
+    text = query.lower()
+    constraints = []
+    spans = []
+
+    for match in _BETWEEN.finditer(text):
+        low_digits, low_scale, high_digits, high_scale, unit = match.groups()
+        field = _field(text[:match.start()], text[match.end():], unit)
+        spans.append((match.start(), match.end()))
+        if field is None:
+            continue
+        # "between 10 and 20 million": the scale of the upper bound applies to both
+        low = _number(low_digits, low_scale or high_scale)
+        high = _number(high_digits, high_scale)
+        constraints.append(Constraint(field, "$gte", low))
+        constraints.append(Constraint(field, "$lte", high))
+
+    previous_end = 0
+    previous_field = None
+    for match in _COMPARISON.finditer(text):
+        if any(start <= match.start() < end for start, end in spans):
+            continue
+        comparator, digits, scale, unit = match.groups()
+        before = text[previous_end:match.start()]
+        previous_end = match.end()
+        spans.append((match.start(), match.end()))
+        field = _field(before, text[match.end():], unit, comparator, previous_field)
+        previous_field = field
+        if field is not None:
+            constraints.append(Constraint(field, _OPERATOR_OF[comparator], _number(digits, scale)))
+
+    # "100 million people or more"
+    for match in _OR_MORE.finditer(text):
+        if any(start <= match.start() < end for start, end in spans):
+            continue
+        digits, scale, unit, words, direction = match.groups()
+        op = "$gte" if direction in ("more", "greater", "higher") else "$lte"
+        field = _field(text[:match.start()], words, unit)
+        if field is not None:
+            constraints.append(Constraint(field, op, _number(digits, scale)))
+    return constraints
+
+
+def where_filter(constraints):
+    """Chroma-style `where` for the constraints, or None if there are none."""
+    clauses = [{field: {op: value}} for field, op, value in constraints]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def plan_query(query, entity_finder=None):
+    """`where` pre-filter implied by the numeric constraints in a question, or None.
+
+    Passed to `Retriever.query(where=...)`, it restricts vector scoring to
+    the matching rows: Chroma filters before its search and `NumpyIndex`
+    scores only the rows in the mask. Questions about one country ("Is the
+    population of France over 70 million?") are not filtered, as that would
+    remove the very row they ask about; `entity_finder` (such as
+    `CountryIndex.mentioned`) tells whether a country is named.
+    """
+    if entity_finder is not None and entity_finder(query) is not None:
+        return None
+    return where_filter(extract_constraints(query))
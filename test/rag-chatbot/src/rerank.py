@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+RERANKERS = ("none", "mmr", "cross-encoder")
+
+
+def _take(results, order, scores):
+    # Single-query Chroma-shaped result with only the rows in order
+    taken = {key: [[results[key][0][i] for i in order]]
+             for key in ('ids', 'documents', 'metadatas') if results.get(key) is not None}
+    taken['distances'] = [[1.0 - float(scores[i]) for i in order]]
+    return taken
+
+
+class Reranker(ABC):
+    """Interface for re-ranking over-fetched retrieval candidates.
+
+    The retriever fetches `fetch_factor` times the requested number of
+    rows and calls `rerank()` with one Chroma-shaped result; rerankers that
+    set `needs_embeddings` also get the candidates' stored embeddings.
+    Rows in `pinned` (the top BM25 hit in hybrid mode, whose vector score
+    can be low) are kept regardless of any cutoff.
+    """
+
+    needs_embeddings = False
+    fetch_factor = 3
+
+    @abstractmethod
+    def rerank(self, query, results, n_results, query_embedding=None, embeddings=None, pinned=()):
+        """Return at most n_results of the candidate rows, best first."""
+
+
+class MMRReranker(Reranker):
+    """Maximal Marginal Relevance over the candidates' embeddings.
+
+    Rows are picked greedily by `lambda_mult * relevance - (1 - lambda_mult)
+    * similarity to the rows already picked`, so near-duplicates make way
+    for rows that add information. Relevance is the cosine similarity to
+    the query; rows below `min_relevance` are dropped, keeping at least
+    `min_keep`, and so are rows more than `max_similarity` similar to one
+    already picked. Pinned rows are picked first. Costs one small matrix
+    product, no model call.
+    """
+
+    needs_embeddings = True
+
+    def __init__(self, lambda_mult=0.7, min_relevance=0.5, max_similarity=0.95, min_keep=1, fetch_factor=3):
+        self.lambda_mult = lambda_mult
+        self.min_relevance = min_relevance
+        self.max_similarity = max_similarity
+        self.min_keep = min_keep
+        self.fetch_factor = fetch_factor
+
+    def rerank(self, query, results, n_results, query_embedding=None, embeddings=None, pinned=()):
+        if query_embedding is None or embeddings is None or not len(embeddings):
+            return {key: [values[0][:n_results]] for key, values in results.items() if values is not None}
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        relevance = vectors @ query_vector
+        similarity = vectors @ vectors.T
+
+        # Only rows above the cutoff are candidates, but keep the best min_keep regardless
+        available = relevance >= self.min_relevance
+        if available.sum() < self.min_keep:
+            available[np.argsort(-relevance)[:self.min_keep]] = True
+
+        selected = []
+        redundancy = np.zeros(len(vectors), dtype=np.float32)
+        for row_id in pinned:
+            if row_id in results['ids'][0] and len(selected) < n_results:
+                best = results['ids'][0].index(row_id)
+                selected.append(best)
+                available[best] = False
+                available &= similarity[best] < self.max_similarity
+                redundancy = np.maximum(redundancy, similarity[best])
+        while len(selected) < n_results and available.any():
+            if selected:
+                scores = self.lambda_mult * relevance - (1 - self.lambda_mult) * redundancy
+            else:
+                scores = relevance.copy()
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            available &= similarity[best] < self.max_similarity
+            redundancy = np.maximum(redundancy, similarity[best])
+        return _take(results, selected, relevance)
+
+
+class CrossEncoderReranker(Reranker):
+    """Score (query, document) pairs with a small CPU cross-encoder.
+
+    Needs the optional `sentence-transformers` package. More accurate than
+    MMR but runs a model per candidate, so keep `fetch_factor` small. Rows
+    scoring below `min_score` (a logit, 0 is roughly "relevant") are dropped,
+    keeping at least `min_keep`; pinned rows go first and are never dropped.
+    """
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", min_score=0.0,
+                 min_keep=1, fetch_factor=2):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.min_score = min_score
+        self.min_keep = min_keep
+        self.fetch_factor = fetch_factor
+
+    def rerank(self, query, results, n_results, query_embedding=None, embeddings=None, pinned=()):
+        documents = results['documents'][0]
+        if not documents:
+            return results
+        scores = np.asarray(self.model.predict([(query, document) for document in documents]))
+        pinned = [i for i, row_id in enumerate(results['ids'][0]) if row_id in pinned]
+        order = (pinned + [int(i) for i in np.argsort(-scores) if int(i) not in pinned])[:n_results]
+        relevant = [i for i in order if i in pinned or scores[i] >= self.min_score]
+        kept = relevant if len(relevant) >= self.min_keep else order[:self.min_keep]
+        # distances are 1 - score, so lower still means more relevant
+        return _take(results, kept, scores)
+
+
+def make_reranker(name, **kwargs):
+    """Reranker for a config value in RERANKERS ("none" gives None)."""
+    if name not in RERANKERS:
+        raise ValueError(f"reranker must be one of {RERANKERS}, got {name!r}")
+    if name == "mmr":
+        return MMRReranker(**kwargs)
+    if name == "cross-encoder":
+        return CrossEncoderReranker(**kwargs)
+    return None
@@ -1,13 +1,157 @@
-import chromadb
+import numpy as np
+
+from bm25 import reciprocal_rank_fusion
+from sync import FINGERPRINT_KEY
+from tracing import tracer
+from vector_index import ChromaIndex, VectorIndex
+
+MODES = ("vector", "hybrid", "lexical")
 
 class Retriever:
-    def __init__(self, collection):
-        self.collection = collection
-
-    def retrieve(self, query, n_results=5):
-        # Query the vector database to find relevant documents
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-        return results['documents'], results['metadatas']
\ No newline at end of file
+    def __init__(self, index, embedding_function=None, lexical_index=None, mode="vector", reranker=None):
+        # Accept any VectorIndex; a plain Chroma collection is wrapped in ChromaIndex
+        self.index = index if isinstance(index, VectorIndex) else ChromaIndex(index)
+        self.embedding_function = embedding_function
+        # mode "hybrid" fuses BM25 and vector rankings, "lexical" additionally
+        # skips the embedding call when the top BM25 hit is unambiguous
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        if mode != "vector" and lexical_index is None:
+            raise ValueError(f"mode {mode!r} needs a lexical_index")
+        self.lexical_index = lexical_index
+        self.mode = mode
+        # Optional rerank.Reranker: candidates are over-fetched and cut down to the relevant ones
+        self.reranker = reranker
+
+    def embed(self, query):
+        # Embed the query once so callers can reuse the vector (e.g. the semantic cache)
+        return self.embed_many([query])[0]
+
+    def embed_many(self, queries):
+        # One embedding call for the whole batch
+        with tracer.span("embed_query", batch=len(queries)):
+            return self.embedding_function(list(queries))
+
+    def query(self, query, n_results=5, query_embedding=None, where=None):
+        # Query the index, reusing a precomputed query embedding if given
+        query_embeddings = [query_embedding] if query_embedding is not None else None
+        return self.query_many([query], n_results, query_embeddings, where)[0]
+
+    def retrieve(self, query, n_results=5, query_embedding=None, where=None):
+        # Query the vector index to find relevant documents
+        results = self.query(query, n_results, query_embedding, where)
+        return results['documents'], results['metadatas']
+
+    def query_many(self, queries, n_results=5, query_embeddings=None, where=None):
+        # Embed all queries in one call and search them in one index query,
+        # then split the batched result into one Chroma-shaped result per query
+        queries = list(queries)
+        results = [None] * len(queries)
+        lexical = self.lexical_index is not None and self.mode != "vector" and not where
+
+        pending = list(range(len(queries)))
+        if lexical and self.mode == "lexical" and query_embeddings is None:
+            # Exact-name hits are answered from BM25 alone, without an embedding call
+            vector_pending = []
+            for i in pending:
+                with tracer.span("lexical_search"):
+                    hit = self.lexical_index.unambiguous_hit(queries[i])
+                if hit is not None:
+                    tracer.count("retrieval.lexical_only")
+                    hits = self.lexical_index.search(queries[i], n_results)
+                    results[i] = self._rows([row_id for row_id, _ in hits])
+                else:
+                    vector_pending.append(i)
+            pending = vector_pending
+        if not pending:
+            return results
+
+        # Over-fetch when fusing so both rankings have room to contribute,
+        # and when re-ranking so the reranker has candidates to choose from.
+        # Filtered queries are not re-ranked: the filter already picked the
+        # rows, and relevance cutoffs would drop most of them
+        rerank = self.reranker is not None and not where
+        fetch = n_results * 2 if lexical else n_results
+        if rerank:
+            fetch = max(fetch, n_results * self.reranker.fetch_factor)
+        batch_queries = [queries[i] for i in pending]
+        if query_embeddings is None and self.embedding_function is not None:
+            query_embeddings = self.embed_many(batch_queries)
+        elif query_embeddings is not None:
+            query_embeddings = [query_embeddings[i] for i in pending]
+        with tracer.span("vector_search", batch=len(pending)):
+            if query_embeddings is not None:
+                batch = self.index.query(
+                    query_embeddings=list(query_embeddings),
+                    n_results=fetch,
+                    where=where
+                )
+            else:
+                batch = self.index.query(
+                    query_texts=batch_queries,
+                    n_results=fetch,
+                    where=where
+                )
+
+        keys = [key for key in ('ids', 'documents', 'metadatas', 'distances') if batch.get(key) is not None]
+        for j, i in enumerate(pending):
+            vector_results = {key: [batch[key][j]] for key in keys}
+            lexical_ids = []
+            if lexical:
+                with tracer.span("lexical_search"):
+                    lexical_ids = [row_id for row_id, _ in self.lexical_index.search(queries[i], fetch)]
+                keep = fetch if rerank else n_results
+                fused = reciprocal_rank_fusion([vector_results['ids'][0], lexical_ids])[:keep]
+                results[i] = self._rows(fused, vector_results)
+            else:
+                results[i] = vector_results
+            if rerank:
+                query_embedding = query_embeddings[j] if query_embeddings is not None else None
+                # The top BM25 hit (often an exact name) is exempt from the reranker's
+                # vector-similarity cutoffs, or they would undo the fusion
+                results[i] = self._rerank(queries[i], results[i], n_results, query_embedding, lexical_ids[:1])
+        return results
+
+    def _rerank(self, query, results, n_results, query_embedding, pinned=()):
+        embeddings = None
+        if self.reranker.needs_embeddings:
+            # Stored vectors of the candidates, a slice of the matrix for NumpyIndex
+            stored = self.index.get(ids=results['ids'][0], include=["embeddings"])
+            positions = {row_id: k for k, row_id in enumerate(stored['ids'])}
+            if len(positions) == len(results['ids'][0]):
+                embeddings = np.asarray(stored['embeddings'])[[positions[row_id] for row_id in results['ids'][0]]]
+        with tracer.span("rerank", candidates=len(results['ids'][0])):
+            return self.reranker.rerank(query, results, n_results, query_embedding, embeddings, pinned)
+
+    def _rows(self, ids, known=None):
+        # Chroma-shaped result for ids in the given order, reusing rows already at hand
+        rows = {}
+        if known is not None:
+            for row_id, document, metadata in zip(known['ids'][0], known['documents'][0], known['metadatas'][0]):
+                rows[row_id] = (document, metadata)
+        missing = [row_id for row_id in ids if row_id not in rows]
+        if missing:
+            stored = self.index.get(ids=missing, include=["documents", "metadatas"])
+            for row_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+                rows[row_id] = (document, metadata)
+        ids = [row_id for row_id in ids if row_id in rows]
+        return {
+            'ids': [ids],
+            'documents': [[rows[row_id][0] for row_id in ids]],
+            'metadatas': [[rows[row_id][1] for row_id in ids]],
+        }
+
+    def retrieve_many(self, queries, n_results=5, where=None):
+        # Batched retrieve(): one (documents, metadatas) pair per query
+        return [
+            (results['documents'], results['metadatas'])
+            for results in self.query_many(queries, n_results, where=where)
+        ]
+
+    def fingerprints(self, ids):
+        # Current content fingerprints of the given documents, used to validate cached answers
+        stored = self.index.get(ids=list(ids), include=["metadatas"])
+        return {
+            row_id: (metadata or {}).get(FINGERPRINT_KEY)
+            for row_id, metadata in zip(stored['ids'], stored['metadatas'])
+        }
\ No newline at end of file
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+
+from tracing import tracer
+
+
+class SemanticCache:
+    """Reuse answers for paraphrased questions by comparing query embeddings.
+
+    Recent (query vector, answer, source fingerprints) entries are kept in a
+    fixed-size float32 matrix that is overwritten oldest-first. A lookup is a
+    single matrix-vector product; an entry is returned when its cosine
+    similarity reaches `threshold` and the documents it was answered from
+    still have the same fingerprints.
+    """
+
+    def __init__(self, threshold=0.92, maxsize=512):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None
+        self._entries = [None] * maxsize
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, validate=None):
+        """Return the cached answer for the closest stored query, or None.
+
+        `validate` is called with the entry's {doc_id: fingerprint} sources
+        and must return False if any of them changed since the answer was
+        generated, in which case the entry is dropped.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self.misses += 1
+                tracer.count("semantic_cache.misses")
+                return None
+            scores = self._vectors @ query
+            best = int(np.argmax(scores))
+            entry = self._entries[best]
+            if entry is None or scores[best] < self.threshold:
+                self.misses += 1
+                tracer.count("semantic_cache.misses")
+                return None
+
+        answer, sources = entry
+        if validate is not None and not validate(sources):
+            with self._lock:
+                if self._entries[best] is entry:
+                    self._entries[best] = None
+                    self._vectors[best] = 0.0
+                self.misses += 1
+            tracer.count("semantic_cache.misses")
+            return None
+
+        with self._lock:
+            self.hits += 1
+        tracer.count("semantic_cache.hits")
+        return answer
+
+    def add(self, vector, answer, sources):
+        """Remember `answer` for the query embedding `vector`.
+
+        `sources` maps the IDs of the documents used to their fingerprints.
+        """
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            slot = self._next
+            self._vectors[slot] = vector
+            self._entries[slot] = (answer, dict(sources))
+            self._next = (slot + 1) % self.maxsize
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._entries = [None] * self.maxsize
+            self._next = 0
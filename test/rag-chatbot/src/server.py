@@ -0,0 +1,304 @@
+"""Headless HTTP/JSON and SSE server for the chatbot.
+
+Usage:
+    python src/server.py [--config config.json] [--port 8000] [--workers N]
+                         [--max-in-flight 32] [--backlog 128]
+
+Endpoints:
+    POST /chat     {"message": "...", "history": [{"user": "...", "assistant": "..."}]}
+                   returns {"response": "..."}; with "stream": true (or
+                   Accept: text/event-stream) the answer is sent as SSE
+                   `data: {"delta": "..."}` events followed by `event: done`.
+    GET  /health   worker pid and requests in flight
+    GET  /metrics  tracing summary in Prometheus text format, for the one
+                   worker that accepted the connection: every worker has
+                   its own tracer, and the response names it in `X-Worker`
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracing import tracer
+
+MAX_BODY_BYTES = 64 * 1024
+HISTORY_TURNS = 6
+STARTUP_FAILED = 3  # worker exit code when build_chatbot() raised; such workers are not respawned
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients reuse connections
+    timeout = 30  # idle keep-alive connections are closed after this many seconds
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "worker": os.getpid(), "in_flight": self.server.in_flight})
+        elif self.path == "/metrics":
+            body = tracer.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Worker", str(os.getpid()))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            self.close_connection = True
+            self._send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "request body too large"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            message = request["message"]
+            if not isinstance(message, str) or not message.strip():
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": 'expected a JSON body with a non-empty "message"'})
+            return
+
+        # Backpressure: beyond max_in_flight requests, fail fast instead of queueing
+        if not self.server.acquire():
+            tracer.count("server.rejected")
+            self._send_json(503, {"error": "server busy, retry later"}, [("Retry-After", "1")])
+            return
+        try:
+            memory = self._memory(request.get("history"))
+            stream = request.get("stream") or "text/event-stream" in (self.headers.get("Accept") or "")
+            with tracer.span("request", stream=bool(stream)):
+                if stream:
+                    self._stream(message, memory)
+                else:
+                    response = self.server.chatbot.get_response(message, memory)
+                    self._send_json(200, {"response": response})
+        except Exception as exc:
+            self._send_json(500, {"error": str(exc)})
+        finally:
+            self.server.release()
+
+    def _memory(self, history):
+        # The server is stateless: clients send their recent turns with each request
+        if not history or not isinstance(history, list):
+            return None
+        memory = self.server.chatbot.new_memory(max_turns=HISTORY_TURNS)
+        for turn in history[-HISTORY_TURNS:]:
+            if isinstance(turn, dict):
+                memory.add_turn(str(turn.get("user", "")), str(turn.get("assistant", "")))
+        return memory
+
+    def _stream(self, message, memory):
+        chunks = self.server.chatbot.get_response_stream(message, memory)
+        # Pull the first chunk before sending headers, so failures still get a JSON error
+        first = next(chunks, None)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            if first is not None:
+                self._event({"delta": first})
+                for chunk in chunks:
+                    self._event({"delta": chunk})
+            self.wfile.write(b"event: done\ndata: {}\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            tracer.count("server.disconnected")
+        except Exception as exc:
+            # Headers are already sent, report the failure as an SSE event
+            self.wfile.write(f"event: error\ndata: {json.dumps({'error': str(exc)})}\n\n".encode("utf-8"))
+        finally:
+            chunks.close()  # stops generation when the client went away
+
+    def _event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class ChatServer(ThreadingHTTPServer):
+    """Threaded HTTP server around one `Chatbot`, with a cap on requests in flight.
+
+    `backlog` bounds the kernel accept queue; once `max_in_flight` requests
+    are being answered, further ones get an immediate 503 with Retry-After.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, chatbot=None, max_in_flight=32, backlog=128):
+        self.request_queue_size = backlog
+        self.chatbot = chatbot
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        super().__init__(address, ChatRequestHandler)
+
+    def acquire(self):
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+
+def serve(build_chatbot, host="127.0.0.1", port=8000, workers=1, max_in_flight=32, backlog=128):
+    """Serve `build_chatbot()` from `workers` pre-forked processes sharing one listening socket.
+
+    Anything loaded before calling this (the read-only indexes) is shared
+    with the workers copy-on-write. `build_chatbot` runs once in each worker
+    after the fork, so every worker opens its own pooled embedding and LLM
+    clients and reuses them for all of its requests. Dead workers are
+    replaced; SIGINT/SIGTERM stop them all. Without os.fork (Windows) a
+    single process is used.
+    """
+    server = ChatServer((host, port), max_in_flight=max_in_flight, backlog=backlog)
+    print(f"Serving on http://{server.server_address[0]}:{server.server_address[1]} "
+          f"with {workers} worker(s)", flush=True)
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        server.chatbot = build_chatbot()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                try:
+                    server.chatbot = build_chatbot()
+                except BaseException:
+                    traceback.print_exc()
+                    code = STARTUP_FAILED
+                else:
+                    server.serve_forever()
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        return pid
+
+    children = {spawn() for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) == STARTUP_FAILED:
+            stop(None, None)  # a worker that cannot start would only fail again
+        elif not stopping:
+            children.add(spawn())
+    server.server_close()
+
+
+def publish_snapshot(config):
+    """Write a fresh snapshot of the configured collection in a spawned process.
+
+    Chroma's client holds threads and file handles that must not be shared
+    across os.fork(), so the serving process never opens it: a throwaway
+    child exports the collection and the parent memory-maps the result.
+    """
+    process = multiprocessing.get_context("spawn").Process(target=_write_snapshot, args=(config,))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"writing a snapshot of {config['collection_name']!r} failed")
+
+
+def _write_snapshot(config):
+    from store import open_collection, prune_snapshots, write_snapshot
+
+    collection, _ = open_collection({**config, "use_snapshot": False})
+    write_snapshot(collection, config["snapshot_directory"])
+    prune_snapshots(config["snapshot_directory"], keep=3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-in-flight", type=int, default=32, help="concurrent requests per worker")
+    parser.add_argument("--backlog", type=int, default=128, help="pending connections queued by the kernel")
+    args = parser.parse_args()
+
+    from main import build_chatbot, load_indexes
+    from store import latest_snapshot, load_store_config
+
+    # Load the indexes once, before forking, from a memory-mapped snapshot every
+    # worker shares; Chroma is only opened in a separate process to publish it
+    config = load_store_config(args.config)
+    if not (config["use_snapshot"] and latest_snapshot(config["snapshot_directory"])):
+        publish_snapshot(config)
+    indexes = load_indexes({**config, "use_snapshot": True, "index_backend": "numpy"})
+    serve(
+        lambda: build_chatbot(args.config, indexes),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        backlog=args.backlog,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+from utils import load_config
+from vector_index import NumpyIndex
+
+DEFAULT_CONFIG = {
+    "persist_directory": "chroma_db",
+    "collection_name": "country_data",
+    "snapshot_directory": "snapshots",
+    "use_snapshot": False,
+    "index_backend": "chroma",
+    "retrieval_mode": "hybrid",
+    "reranker": "mmr",
+    "semantic_cache": False,
+    "semantic_cache_threshold": 0.92,
+}
+
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "LATEST"
+
+
+def load_store_config(config_file="config.json"):
+    """Vector store settings from `config_file`, falling back to DEFAULT_CONFIG."""
+    config = dict(DEFAULT_CONFIG)
+    if config_file and os.path.exists(config_file):
+        config.update(load_config(config_file))
+    return config
+
+
+def open_client(config):
+    """Persistent Chroma client, so data written by earlier runs is readable immediately."""
+    import chromadb
+    from chromadb.config import Settings
+
+    return chromadb.PersistentClient(
+        path=config["persist_directory"],
+        settings=Settings(anonymized_telemetry=False),
+    )
+
+
+def open_collection(config, embedding_function=None):
+    """Open the configured collection and return (collection, startup_seconds).
+
+    With `use_snapshot` set and a snapshot present, the latest snapshot is
+    loaded read-only instead of opening Chroma.
+    """
+    start = time.perf_counter()
+    snapshot = latest_snapshot(config["snapshot_directory"]) if config.get("use_snapshot") else None
+    if snapshot is not None:
+        collection = load_snapshot(snapshot, embedding_function)
+    else:
+        client = open_client(config)
+        collection = client.get_or_create_collection(
+            name=config["collection_name"], embedding_function=embedding_function
+        )
+    return collection, time.perf_counter() - start
+
+
+def write_snapshot(collection, snapshot_directory):
+    """Export a collection to a new versioned snapshot and mark it as the latest.
+
+    A snapshot is a saved `NumpyIndex` (normalized float32 embeddings in
+    `embeddings.npy`, ids, documents and metadatas in `rows.json`) plus a
+    `manifest.json` describing it. It is written to a temporary directory and
+    renamed into place, so readers never see a partial snapshot. Returns its
+    path.
+    """
+    # Timestamped versions sort chronologically
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    final_path = os.path.join(snapshot_directory, version)
+    tmp_path = f"{final_path}.tmp"
+    os.makedirs(tmp_path)
+
+    index = NumpyIndex.from_collection(collection)
+    files = index.save(tmp_path)
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as file:
+        json.dump({
+            "format": 1,
+            "version": version,
+            "created": time.time(),
+            "count": index.count(),
+            "dimension": index.dimension,
+            "normalized": True,
+            "files": files,
+        }, file, indent=4)
+
+    os.replace(tmp_path, final_path)
+    latest_tmp = os.path.join(snapshot_directory, f"{LATEST_FILE}.tmp")
+    with open(latest_tmp, "w") as file:
+        file.write(version)
+    os.replace(latest_tmp, os.path.join(snapshot_directory, LATEST_FILE))
+    return final_path
+
+
+def latest_snapshot(snapshot_directory):
+    """Path of the snapshot marked as latest, or None if there is none."""
+    try:
+        with open(os.path.join(snapshot_directory, LATEST_FILE)) as file:
+            version = file.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(snapshot_directory, version)
+    return path if os.path.exists(os.path.join(path, MANIFEST_FILE)) else None
+
+
+def prune_snapshots(snapshot_directory, keep=3):
+    """Delete all but the `keep` newest snapshots, never the latest one."""
+    latest = latest_snapshot(snapshot_directory)
+    versions = sorted(
+        name for name in os.listdir(snapshot_directory)
+        if os.path.exists(os.path.join(snapshot_directory, name, MANIFEST_FILE))
+    )
+    for name in versions[:-keep] if keep else versions:
+        path = os.path.join(snapshot_directory, name)
+        if path != latest:
+            shutil.rmtree(path)
+
+
+def load_snapshot(path, embedding_function=None):
+    """Load a snapshot as a read-only `NumpyIndex` with the embeddings memory-mapped."""
+    with open(os.path.join(path, MANIFEST_FILE)) as file:
+        manifest = json.load(file)
+    return NumpyIndex.load(path, embedding_function, files=manifest["files"])
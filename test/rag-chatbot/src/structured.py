@@ -0,0 +1,210 @@
+import re
+import threading
+from collections import Counter
+
+from cache import normalize_query
+
+
+def parse_number(text):
+    """Parse a scraped number such as "1,234" or "468.0" into an int or float, or None."""
+    if isinstance(text, (int, float)):
+        return text
+    cleaned = str(text).replace(",", "").strip()
+    try:
+        return int(cleaned)
+    except ValueError:
+        pass
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+# Capitals the source lists for countries without one (Antarctica, Israel, Tokelau: "None")
+_NO_CAPITAL = {"", "none", "n a", "na", "null", "unknown"}
+
+POPULATION_WORDS = {"population", "populous", "populated", "people", "inhabitants"}
+AREA_WORDS = {"area", "size", "big", "large"}
+
+# Lookups are answered only when the whole (normalized) question matches one
+# of these templates; anything with extra qualifiers ("population density of
+# X", "most populous country in Europe", "X and Y") is left to RAG
+_ASK = r"(?:(?:what|which) (?:is|s|are) |whats |tell me |give me |show me |list )?(?:the )?"
+_SUPERLATIVES = r"largest|biggest|smallest|most populous|least populous|most populated|least populated"
+_FIELD_OF = re.compile(_ASK + r"(population|area|size|capital|capital city) of (?P<country>.+)")
+_HOW_MANY_PEOPLE = re.compile(r"how many (?:people|inhabitants) live in (?P<country>.+)")
+_HOW_BIG = re.compile(r"how (?:big|large) is (?P<country>.+)")
+_CAPITAL_OF_WHICH = [
+    re.compile(r"(?P<capital>.+) is the capital of (?:which|what) country"),
+    re.compile(r"(?:which|what) country has (?P<capital>.+) as (?:its|the) capital"),
+    re.compile(r"(?:which|what) country is (?P<capital>.+) the capital of"),
+]
+_TOP_N = re.compile(_ASK + r"(?P<end>top|bottom) (?P<n>\d+) (?:countries )?by (?P<field>population|area|size)")
+_N_SUPERLATIVE = re.compile(
+    _ASK + r"(?:top )?(?P<n>\d+) (?P<superlative>" + _SUPERLATIVES + r") countries"
+    r"(?: by (?P<field>population|area|size))?(?: in the world)?"
+)
+_SUPERLATIVE = re.compile(
+    _ASK + r"(?P<superlative>" + _SUPERLATIVES + r") country"
+    r"(?: by (?P<field>population|area|size))?(?: in the world)?"
+)
+_FIELDS = {"population": "population", "area": "area", "size": "area"}
+
+
+class CountryIndex:
+    """Columnar in-memory index of country metadata for exact lookups.
+
+    Numeric fields are parsed once at build time, names and capitals are
+    looked up through dicts, and questions that match one of a few anchored
+    templates ("capital of France", "top 10 by population") are answered
+    without retrieval or an LLM call. `answer()` returns None for anything
+    else, including lookups with extra qualifiers, so the caller can fall
+    back to RAG.
+    """
+
+    def __init__(self, metadatas=()):
+        self._lock = threading.Lock()
+        self.rebuild(metadatas)
+
+    @classmethod
+    def from_collection(cls, collection):
+        return cls(collection.get(include=["metadatas"])["metadatas"])
+
+    def rebuild(self, metadatas):
+        names, capitals, populations, areas = [], [], [], []
+        for metadata in metadatas:
+            names.append(metadata["name"])
+            capitals.append(metadata["capital"])
+            populations.append(parse_number(metadata.get("population")))
+            areas.append(parse_number(metadata.get("area")))
+
+        by_name = {normalize_query(name): i for i, name in enumerate(names)}
+        # Placeholder and shared capitals name no single country: "None of
+        # the rows say so" must not count as mentioning Israel
+        capital_keys = [normalize_query(str(capital or "")) for capital in capitals]
+        counts = Counter(capital_keys)
+        by_capital = {
+            key: i for i, key in enumerate(capital_keys) if key not in _NO_CAPITAL and counts[key] == 1
+        }
+        # Longest first, so "Niger" does not shadow "Nigeria"
+        name_keys = sorted(by_name, key=len, reverse=True)
+        capital_keys = sorted(by_capital, key=len, reverse=True)
+
+        with self._lock:
+            self.names, self.capitals = names, capitals
+            self.columns = {"population": populations, "area": areas}
+            self.by_name, self.by_capital = by_name, by_capital
+            self._name_keys, self._capital_keys = name_keys, capital_keys
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _find(text, keys):
+        padded = f" {text} "
+        for key in keys:
+            if key and f" {key} " in padded:
+                return key
+        return None
+
+    def lookup(self, name):
+        """Return the metadata row for a country name, or None."""
+        i = self.by_name.get(normalize_query(name))
+        if i is None:
+            return None
+        return {
+            "name": self.names[i],
+            "capital": self.capitals[i],
+            "population": self.columns["population"][i],
+            "area": self.columns["area"][i],
+        }
+
+    def mentioned(self, text):
+        """Name of the first country named in text (or whose capital is), or None."""
+        text = normalize_query(text)
+        name_key = self._find(text, self._name_keys)
+        if name_key is not None:
+            return self.names[self.by_name[name_key]]
+        capital_key = self._find(text, self._capital_keys)
+        if capital_key is not None:
+            return self.names[self.by_capital[capital_key]]
+        return None
+
+    def ranked(self, field, n, descending=True):
+        """Indices of the n countries with the highest (or lowest) value of field."""
+        column = self.columns[field]
+        present = [i for i, value in enumerate(column) if value is not None]
+        present.sort(key=column.__getitem__, reverse=descending)
+        return present[:n]
+
+    def _country(self, text):
+        i = self.by_name.get(text)
+        if i is None and text.startswith("the "):
+            i = self.by_name.get(text[4:])
+        return i
+
+    def answer(self, query):
+        """Answer a structured lookup directly, or return None to fall back to RAG."""
+        if not self.names:
+            return None
+        text = normalize_query(query)
+
+        match = _FIELD_OF.fullmatch(text) or _HOW_MANY_PEOPLE.fullmatch(text) or _HOW_BIG.fullmatch(text)
+        if match:
+            i = self._country(match.group("country"))
+            if i is None:
+                return None
+            if match.re is _FIELD_OF:
+                field = match.group(1)
+                if field.startswith("capital"):
+                    if normalize_query(str(self.capitals[i] or "")) in _NO_CAPITAL:
+                        return None
+                    return f"The capital of {self.names[i]} is {self.capitals[i]}."
+                field = _FIELDS[field]
+            else:
+                field = "population" if match.re is _HOW_MANY_PEOPLE else "area"
+            if self.columns[field][i] is None:
+                return None
+            return f"The {field} of {self.names[i]} is {self._format(field, self.columns[field][i])}."
+
+        for pattern in _CAPITAL_OF_WHICH:
+            match = pattern.fullmatch(text)
+            if match:
+                i = self.by_capital.get(match.group("capital"))
+                if i is None:
+                    return None
+                return f"{self.capitals[i]} is the capital of {self.names[i]}."
+
+        match = _TOP_N.fullmatch(text)
+        if match:
+            field = _FIELDS[match.group("field")]
+            return self._ranking(field, int(match.group("n")), match.group("end") == "top")
+
+        match = _N_SUPERLATIVE.fullmatch(text) or _SUPERLATIVE.fullmatch(text)
+        if match:
+            superlative = match.group("superlative")
+            field = _FIELDS.get(match.group("field")) or ("population" if "popul" in superlative else "area")
+            descending = not superlative.startswith(("smallest", "least"))
+            if match.re is _N_SUPERLATIVE:
+                return self._ranking(field, int(match.group("n")), descending)
+            rows = self.ranked(field, 1, descending)
+            if rows:
+                i = rows[0]
+                return f"{self.names[i]} ({self._format(field, self.columns[field][i])})."
+        return None
+
+    def _ranking(self, field, n, descending):
+        # "top 0 by population", or no country with a value: nothing to list, fall back to RAG
+        rows = self.ranked(field, n, descending) if n >= 1 else []
+        if not rows:
+            return None
+        return "\n".join(
+            f"{rank}. {self.names[i]}: {self._format(field, self.columns[field][i])}"
+            for rank, i in enumerate(rows, start=1)
+        )
+
+    @staticmethod
+    def _format(field, value):
+        if field == "area":
+            return f"{value:,.1f} km²"
+        return f"{value:,}"
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import re
+
+from structured import parse_number
+
+FINGERPRINT_KEY = "_fingerprint"
+
+
+def country_id(name):
+    """Stable ID derived from the country name rather than its position on the page."""
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    return f"country_{slug}"
+
+
+def content_fingerprint(document, metadata):
+    """Hash of everything that is stored for a row, used to detect changes."""
+    payload = json.dumps(
+        {"document": document, "metadata": metadata}, sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_rows(countries, seen=None):
+    """Turn scraped country dicts into (documents, metadatas, ids) for ChromaDB.
+
+    `seen` collects the IDs already built, so batches of one scrape can be
+    built separately without duplicating a country.
+    """
+    documents = []
+    metadatas = []
+    ids = []
+    seen = set() if seen is None else seen
+
+    for country in countries:
+        row_id = country_id(country["name"])
+        if row_id in seen:
+            continue  # Same country listed twice, keep the first occurrence
+        seen.add(row_id)
+
+        # Create a text representation of the country for the document
+        documents.append(
+            f"Country: {country['name']}, Capital: {country['capital']}, "
+            f"Population: {country['population']}, Area: {country['area']}"
+        )
+        # Numbers are stored typed, so range queries can filter on them
+        metadata = {"name": country["name"], "capital": country["capital"]}
+        population = parse_number(country["population"])
+        area = parse_number(country["area"])
+        if population is not None:
+            metadata["population"] = int(population)
+        if area is not None:
+            metadata["area"] = float(area)
+        metadatas.append(metadata)
+        ids.append(row_id)
+
+    return documents, metadatas, ids
+
+
+def _stored_fingerprints(collection):
+    stored = collection.get(include=["metadatas"])
+    return {
+        row_id: (metadata or {}).get(FINGERPRINT_KEY)
+        for row_id, metadata in zip(stored["ids"], stored["metadatas"])
+    }
+
+
+def _changed_rows(existing, documents, metadatas, ids, changes):
+    """Rows whose fingerprint differs from the stored one, with the fingerprint added.
+
+    Adds the number of added, updated and unchanged rows to `changes`.
+    """
+    upsert_docs, upsert_metas, upsert_ids = [], [], []
+    for document, metadata, row_id in zip(documents, metadatas, ids):
+        fingerprint = content_fingerprint(document, metadata)
+        if existing.get(row_id) == fingerprint:
+            changes["unchanged"] += 1
+            continue
+        changes["updated" if row_id in existing else "added"] += 1
+        upsert_docs.append(document)
+        upsert_metas.append({**metadata, FINGERPRINT_KEY: fingerprint})
+        upsert_ids.append(row_id)
+    return upsert_docs, upsert_metas, upsert_ids
+
+
+def _upsert(collection, batches, pipeline, batch_size):
+    if pipeline is not None:
+        pipeline.run_batches(batches)
+        return
+    for documents, metadatas, ids in batches:
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.upsert(documents=documents[start:end], metadatas=metadatas[start:end], ids=ids[start:end])
+
+
+def sync_collection(collection, documents, metadatas, ids, batch_size=500, pipeline=None):
+    """Bring a live collection in line with the given rows without recreating it.
+
+    Rows whose fingerprint matches what is already stored are left untouched,
+    changed or new rows are upserted and rows that disappeared are deleted.
+    The collection stays queryable throughout. When an `IngestPipeline` is
+    given, the changed rows are embedded and written through it in batches.
+    Returns a dict with the number of added, updated, deleted and unchanged rows.
+    """
+    existing = _stored_fingerprints(collection)
+    changes = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    _upsert(collection, [_changed_rows(existing, documents, metadatas, ids, changes)], pipeline, batch_size)
+
+    stale = sorted(set(existing) - set(ids))
+    if stale:
+        collection.delete(ids=stale)
+    changes["deleted"] = len(stale)
+    return changes
+
+
+def sync_records(collection, countries, batch_size=100, pipeline=None):
+    """Sync scraped country records into a live collection while they are still arriving.
+
+    `countries` may be a generator such as `PageFetcher.stream_records()`:
+    every `batch_size` records are built into rows and their changed rows
+    are embedded and written while later pages are still being fetched.
+    Rows missing from the scrape are deleted once it has finished, unless
+    it produced no records at all. Returns (changes, (documents, metadatas,
+    ids)) with the same counts as `sync_collection` and every scraped row.
+    """
+    existing = _stored_fingerprints(collection)
+    changes = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    documents, metadatas, ids = [], [], []
+    seen = set()
+
+    def changed_batches():
+        batch = []
+        for country in countries:
+            batch.append(country)
+            if len(batch) < batch_size:
+                continue
+            yield build_batch(batch)
+            batch = []
+        if batch:
+            yield build_batch(batch)
+
+    def build_batch(batch):
+        batch_docs, batch_metas, batch_ids = build_rows(batch, seen)
+        documents.extend(batch_docs)
+        metadatas.extend(batch_metas)
+        ids.extend(batch_ids)
+        return _changed_rows(existing, batch_docs, batch_metas, batch_ids, changes)
+
+    _upsert(collection, changed_batches(), pipeline, batch_size)
+
+    stale = sorted(set(existing) - set(ids)) if ids else []
+    if stale:
+        collection.delete(ids=stale)
+    changes["deleted"] = len(stale)
+    return changes, (documents, metadatas, ids)
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.observe(self.name, duration, self.attributes)
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Tracer:
+    """Per-stage latency spans and counters for the RAG pipeline.
+
+    `span(name)` times a block, `count(name)` bumps a counter (cache hits,
+    tokens). Latencies are kept per stage in a bounded window for p50/p95,
+    can be appended to a JSONL file and exported in Prometheus text format.
+    When disabled, `span()` returns a shared no-op and `count()` and
+    `observe()` return immediately, so instrumented code pays almost nothing.
+    """
+
+    def __init__(self, enabled=False, jsonl_path=None, window=2048):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = defaultdict(lambda: deque(maxlen=self.window))
+            self._totals = defaultdict(lambda: [0, 0.0])  # count, sum of seconds
+            self._counters = defaultdict(float)
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name, seconds, attributes=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples[name].append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+        if self.jsonl_path:
+            record = {"ts": time.time(), "span": name, "seconds": round(seconds, 6), **(attributes or {})}
+            line = json.dumps(record, default=str)
+            with self._lock, open(self.jsonl_path, "a") as file:
+                file.write(line + "\n")
+
+    def summary(self):
+        """{stage: {"count", "p50", "p95", "total"}} in seconds, plus counters."""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            totals = {name: tuple(values) for name, values in self._totals.items()}
+            counters = dict(self._counters)
+        stages = {
+            name: {
+                "count": totals[name][0],
+                "p50": _quantile(ordered, 0.50),
+                "p95": _quantile(ordered, 0.95),
+                "total": totals[name][1],
+            }
+            for name, ordered in samples.items()
+        }
+        return {"stages": stages, "counters": counters}
+
+    def prometheus_text(self):
+        summary = self.summary()
+        lines = [
+            "# HELP rag_stage_seconds Latency of each RAG pipeline stage.",
+            "# TYPE rag_stage_seconds summary",
+        ]
+        for name, stage in sorted(summary["stages"].items()):
+            lines.append(f'rag_stage_seconds{{stage="{name}",quantile="0.5"}} {stage["p50"]:.6f}')
+            lines.append(f'rag_stage_seconds{{stage="{name}",quantile="0.95"}} {stage["p95"]:.6f}')
+            lines.append(f'rag_stage_seconds_sum{{stage="{name}"}} {stage["total"]:.6f}')
+            lines.append(f'rag_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        lines.append("# HELP rag_events_total Cache hits, token counts and other pipeline counters.")
+        lines.append("# TYPE rag_events_total counter")
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f'rag_events_total{{event="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port=9464, host="127.0.0.1"):
+        """Serve /metrics in Prometheus text format from a daemon thread; returns the server."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Shared tracer, enabled with RAG_TRACE=1 (and RAG_TRACE_FILE=path.jsonl to log spans)
+tracer = Tracer(
+    enabled=os.environ.get("RAG_TRACE", "") not in ("", "0"),
+    jsonl_path=os.environ.get("RAG_TRACE_FILE") or None,
+)
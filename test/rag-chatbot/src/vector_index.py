@@ -0,0 +1,219 @@
+import json
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class VectorIndex(ABC):
+    """Interface the retriever searches through.
+
+    Results use the same shape as a Chroma query: a dict of per-query lists
+    under "ids", "documents", "metadatas" and "distances".
+    """
+
+    @abstractmethod
+    def count(self):
+        """Number of rows in the index."""
+
+    @abstractmethod
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        """Rows by ID and/or `where` filter, like `Collection.get()`."""
+
+    @abstractmethod
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None):
+        """Nearest rows to each query, like `Collection.query()`."""
+
+
+class ChromaIndex(VectorIndex):
+    """VectorIndex over a Chroma collection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def count(self):
+        return self.collection.count()
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        return self.collection.get(ids=ids, where=where, include=list(include), limit=limit, offset=offset)
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None):
+        if query_embeddings is not None:
+            return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+        return self.collection.query(query_texts=query_texts, n_results=n_results, where=where)
+
+
+_COMPARISONS = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+class NumpyIndex(VectorIndex):
+    """Exact in-process vector index over a contiguous float32 matrix.
+
+    Vectors are L2-normalized once, so a batch of queries is scored with a
+    single matrix multiplication and the top k are picked with
+    `argpartition`. Chroma-style `where` filters are evaluated as boolean
+    masks over per-field metadata columns. Distances are 1 - cosine
+    similarity. `save()`/`load()` store the matrix as `.npy`, which `load()`
+    memory-maps read-only.
+    """
+
+    def __init__(self, ids, documents, metadatas, embeddings, embedding_function=None, normalized=False):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.embedding_function = embedding_function
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.size == 0:
+            vectors = np.zeros((len(self.ids), vectors.shape[-1] if vectors.ndim == 2 else 0), dtype=np.float32)
+        elif vectors.ndim != 2:
+            vectors = vectors.reshape(len(self.ids), -1)
+        if not normalized:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = np.ascontiguousarray(vectors / np.maximum(norms, 1e-12), dtype=np.float32)
+        self.vectors = vectors
+        self._positions = {row_id: i for i, row_id in enumerate(self.ids)}
+        self._columns = {}
+
+    @classmethod
+    def from_collection(cls, collection, embedding_function=None, page_size=5000):
+        """Copy every row of a Chroma collection into a new index."""
+        ids, documents, metadatas, embeddings = [], [], [], []
+        offset = 0
+        while True:
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+            )
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+            embeddings.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+        matrix = np.concatenate(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+        return cls(ids, documents, metadatas, matrix, embedding_function)
+
+    def save(self, directory):
+        """Write `embeddings.npy` and `rows.json` to directory and return their file names."""
+        np.save(os.path.join(directory, "embeddings.npy"), self.vectors)
+        with open(os.path.join(directory, "rows.json"), "w") as file:
+            json.dump({"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}, file)
+        return {"embeddings": "embeddings.npy", "rows": "rows.json"}
+
+    @classmethod
+    def load(cls, directory, embedding_function=None, files=None, mmap=True):
+        files = files or {"embeddings": "embeddings.npy", "rows": "rows.json"}
+        vectors = np.load(os.path.join(directory, files["embeddings"]), mmap_mode="r" if mmap else None)
+        with open(os.path.join(directory, files["rows"])) as file:
+            rows = json.load(file)
+        return cls(rows["ids"], rows["documents"], rows["metadatas"], vectors,
+                   embedding_function, normalized=True)
+
+    @property
+    def dimension(self):
+        return self.vectors.shape[1] if self.vectors.size else 0
+
+    def count(self):
+        return len(self.ids)
+
+    def _column(self, field):
+        column = self._columns.get(field)
+        if column is None:
+            values = [(metadata or {}).get(field) for metadata in self.metadatas]
+            if all(isinstance(value, (int, float)) or value is None for value in values):
+                column = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            else:
+                column = np.array(values, dtype=object)
+            self._columns[field] = column
+        return column
+
+    def mask(self, where):
+        """Boolean mask of the rows matching a Chroma-style `where` filter."""
+        if not where:
+            return np.ones(len(self.ids), dtype=bool)
+        masks = []
+        for key, condition in where.items():
+            if key == "$and":
+                masks.append(np.logical_and.reduce([self.mask(clause) for clause in condition]))
+            elif key == "$or":
+                masks.append(np.logical_or.reduce([self.mask(clause) for clause in condition]))
+            else:
+                column = self._column(key)
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for op, value in condition.items():
+                    if op == "$in":
+                        masks.append(np.isin(column, list(value)))
+                    elif op == "$nin":
+                        masks.append(~np.isin(column, list(value)))
+                    elif column.dtype == object and op not in ("$eq", "$ne"):
+                        masks.append(np.zeros(len(column), dtype=bool))
+                    else:
+                        masks.append(np.asarray(_COMPARISONS[op](column, value), dtype=bool))
+        return np.logical_and.reduce(masks)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        if ids is not None:
+            positions = np.array([self._positions[row_id] for row_id in ids if row_id in self._positions],
+                                 dtype=np.int64)
+        else:
+            positions = np.arange(len(self.ids))
+        if where:
+            positions = positions[self.mask(where)[positions]]
+        positions = positions[offset:None if limit is None else offset + limit]
+
+        result = {"ids": [self.ids[i] for i in positions]}
+        if "documents" in include:
+            result["documents"] = [self.documents[i] for i in positions]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[i] for i in positions]
+        if "embeddings" in include:
+            result["embeddings"] = np.asarray(self.vectors[positions])
+        return result
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None):
+        if not self.ids:
+            # Nothing scraped yet: no rows to score, and no embedding call needed to find that out
+            n_queries = len(query_embeddings if query_embeddings is not None else query_texts)
+            return {key: [[] for _ in range(n_queries)] for key in ("ids", "documents", "metadatas", "distances")}
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        if where:
+            candidates = np.flatnonzero(self.mask(where))
+            scores = queries @ self.vectors[candidates].T
+        else:
+            candidates = None
+            scores = queries @ self.vectors.T
+
+        k = min(n_results, scores.shape[1])
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if k == 0:
+            for _ in range(len(queries)):
+                for values in result.values():
+                    values.append([])
+            return result
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        if candidates is not None:
+            top = candidates[top]
+
+        for rows, row_scores in zip(top, top_scores):
+            result["ids"].append([self.ids[i] for i in rows])
+            result["documents"].append([self.documents[i] for i in rows])
+            result["metadatas"].append([self.metadatas[i] for i in rows])
+            result["distances"].append((1.0 - row_scores).tolist())
+        return result
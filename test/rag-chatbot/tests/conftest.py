@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sys
+import uuid
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+class FakeEmbedder:
+    """Local embedding function: a deterministic unit vector per text, counting its calls."""
+
+    def __init__(self, dimension=16):
+        self.dimension = dimension
+        self.calls = 0
+        self.texts = 0
+        self._model_name = f"fake-{dimension}"
+
+    def __call__(self, input):
+        texts = list(input)
+        self.calls += 1
+        self.texts += len(texts)
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+
+@pytest.fixture
+def embedder():
+    return FakeEmbedder()
+
+
+@pytest.fixture
+def chroma_client():
+    chromadb = pytest.importorskip("chromadb")
+    from chromadb.config import Settings
+
+    return chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+
+
+@pytest.fixture
+def new_collection(chroma_client):
+    """Factory for empty, uniquely named collections that take precomputed embeddings."""
+    def create():
+        return chroma_client.create_collection(f"test-{uuid.uuid4().hex}", embedding_function=None)
+    return create
+
+
+def country(name, capital="Capital", population="1,000", area="10.0"):
+    return {"name": name, "capital": capital, "population": population, "area": area}
+
+
+COUNTRY_ROW = """
+<div class="col-md-4 country">
+    <h3 class="country-name"><i class="flag-icon flag-icon-xx"></i> Country {i}</h3>
+    <div class="country-info">
+        <strong>Capital:</strong> <span class="country-capital">Capital {i}</span><br>
+        <strong>Population:</strong> <span class="country-population">{population}</span><br>
+        <strong>Area (km<sup>2</sup>):</strong> <span class="country-area">{area}</span><br>
+    </div>
+</div>
+"""
+
+
+def country_page(rows, start=0):
+    """scrapethissite-style page listing Country {start} .. Country {start + rows - 1}."""
+    body = "".join(
+        COUNTRY_ROW.format(i=i, population=f"{1000 + i * 37:,}", area=f"{10.0 + i * 1.5:.1f}")
+        for i in range(start, start + rows)
+    )
+    return f"<html><body><section><div class=\"row\">{body}</div></section></body></html>"
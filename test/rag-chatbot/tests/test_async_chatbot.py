@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from async_chatbot import AsyncChatbot, AsyncResponseGenerator, AsyncRetriever
+from generator import FakeBackend, LLMBackend, ResponseGenerator
+from structured import CountryIndex
+
+COUNTRIES = [
+    {"name": "France", "capital": "Paris", "population": "64,768,389", "area": "547030.0"},
+    {"name": "China", "capital": "Beijing", "population": "1,330,044,000", "area": "9596960.0"},
+]
+
+
+class RecordingRetriever:
+    """Blocking retriever that records its queries and returns one fixed row."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.queries = []
+
+    def query(self, query, n_results=5, query_embedding=None, where=None):
+        self.queries.append(query)
+        time.sleep(self.latency)
+        return {
+            "ids": [["country_france"]],
+            "documents": [["Country: France, Capital: Paris"]],
+            "metadatas": [[{"name": "France"}]],
+        }
+
+
+class CountingBackend(LLMBackend):
+    """Blocking backend that yields `chunks` chunks `delay` seconds apart and counts them."""
+
+    model_name = "counting"
+
+    def __init__(self, chunks=50, delay=0.01):
+        self.chunks = chunks
+        self.delay = delay
+        self.produced = 0
+        self.finished = threading.Event()
+
+    def stream(self, prompt):
+        try:
+            for i in range(self.chunks):
+                time.sleep(self.delay)
+                self.produced += 1
+                yield f"{i} "
+        finally:
+            self.finished.set()
+
+
+def make_chatbot(backend, retriever=None, timeout=5.0):
+    retriever = retriever or RecordingRetriever()
+    chatbot = AsyncChatbot(
+        AsyncRetriever(retriever),
+        AsyncResponseGenerator(ResponseGenerator(backend=backend)),
+        timeout=timeout,
+        country_index=CountryIndex(COUNTRIES),
+    )
+    return chatbot, retriever
+
+
+def test_pipelined_follow_up_resolves_against_the_earlier_question():
+    chatbot, retriever = make_chatbot(FakeBackend(reply="It is a country in Europe.", chunk_latency=0.01))
+
+    async def run():
+        conversation = chatbot.conversation()
+        return await asyncio.gather(conversation.ask("Tell me about France"),
+                                    conversation.ask("and its capital?"))
+
+    asyncio.run(run())
+    assert retriever.queries == ["Tell me about France", "and its capital? (France)"]
+
+
+def test_follow_up_is_retrieved_again_when_an_earlier_answer_names_the_country():
+    chatbot, retriever = make_chatbot(FakeBackend(reply="China has the most people.", chunk_latency=0.01))
+
+    async def run():
+        conversation = chatbot.conversation()
+        return await asyncio.gather(conversation.ask("Which country has the most people?"),
+                                    conversation.ask("and its capital?"))
+
+    asyncio.run(run())
+    assert retriever.queries[-1] == "and its capital? (China)"
+
+
+class SlowFirstRetriever(RecordingRetriever):
+    def query(self, query, n_results=5, query_embedding=None, where=None):
+        self.latency = 0.2 if query == "first question" else 0.0
+        return super().query(query, n_results, query_embedding, where)
+
+
+def test_answers_stream_in_turn_order():
+    # The first turn retrieves slowly, yet the second is only generated after it
+    prompts = []
+    backend = FakeBackend(reply=lambda prompt: prompts.append(prompt) or "ok")
+    chatbot, _ = make_chatbot(backend, SlowFirstRetriever())
+
+    async def run():
+        conversation = chatbot.conversation()
+        first = asyncio.ensure_future(conversation.ask("first question"))
+        second = asyncio.ensure_future(conversation.ask("second question"))
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(run()) == ["ok", "ok"]
+    assert [prompt.rsplit("User: ", 1)[1] for prompt in prompts] == ["first question\nChatbot:",
+                                                                    "second question\nChatbot:"]
+    # The second prompt already carries the first turn as history
+    assert "first question" in prompts[1].rsplit("User: ", 1)[0]
+
+
+def test_slow_generation_times_out():
+    chatbot, _ = make_chatbot(FakeBackend(first_token_latency=0.5), timeout=0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(chatbot.get_response("Tell me about France"))
+
+
+def test_cancellation_stops_a_blocking_backend():
+    backend = CountingBackend()
+    chatbot, _ = make_chatbot(backend)
+
+    async def run():
+        task = asyncio.ensure_future(chatbot.get_response("Tell me about France"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert backend.finished.wait(1.0)
+    assert backend.produced < backend.chunks
+
+
+def test_structured_lookup_skips_retrieval_and_generation():
+    backend = CountingBackend()
+    chatbot, retriever = make_chatbot(backend)
+    assert asyncio.run(chatbot.get_response("What is the capital of France?")) == "The capital of France is Paris."
+    assert backend.produced == 0
+    assert retriever.queries == []
@@ -0,0 +1,63 @@
+import cache
+from cache import RAGCache, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    lru = TTLCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1  # "b" is now the least recently used
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+    assert len(lru) == 2
+
+
+def test_setting_an_existing_key_refreshes_it():
+    lru = TTLCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.set("a", 10)
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 10
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    ttl = TTLCache(ttl=60)
+    ttl.set("a", 1)
+    clock.now += 59
+    assert ttl.get("a") == 1
+    clock.now += 2
+    assert ttl.get("a", "expired") == "expired"
+    assert len(ttl) == 0
+    assert (ttl.hits, ttl.misses) == (1, 1)
+
+
+def test_rag_cache_shares_keys_across_trivial_variants():
+    rag = RAGCache()
+    rag.set_retrieval("What is the capital of France?", ["Paris"])
+    assert rag.get_retrieval("what is the capital of france") == ["Paris"]
+    rag.set_answer("prompt", "model-a", "answer")
+    assert rag.get_answer("prompt", "model-a") == "answer"
+    assert rag.get_answer("prompt", "model-b") is None
+
+
+def test_invalidate_clears_both_levels():
+    rag = RAGCache()
+    rag.set_retrieval("q", ["row"])
+    rag.set_answer("prompt", "model", "answer")
+    rag.invalidate()
+    assert rag.get_retrieval("q") is None
+    assert rag.get_answer("prompt", "model") is None
+    assert rag.stats()["retrievals"]["size"] == rag.stats()["answers"]["size"] == 0
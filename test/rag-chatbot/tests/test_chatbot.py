@@ -0,0 +1,62 @@
+import pytest
+
+from bm25 import BM25Index
+from chatbot import Chatbot
+from conftest import country
+from generator import FakeBackend, ResponseGenerator
+from rerank import MMRReranker
+from retriever import Retriever
+from semantic_cache import SemanticCache
+from structured import CountryIndex
+from sync import build_rows
+from vector_index import NumpyIndex
+
+QUERIES = [
+    "Tell me about Country 3",
+    "Which country has Capital 7 as its capital city?",
+    "What is the capital of Country 5?",  # answered by the structured index
+    "countries in the north",
+    "Country 12 facts",
+    "population of countries near the sea",
+]
+
+
+@pytest.fixture
+def index(embedder):
+    documents, metadatas, ids = build_rows(
+        [country(f"Country {i}", f"Capital {i}", f"{(i + 1) * 1000:,}") for i in range(20)]
+    )
+    return NumpyIndex(ids, documents, metadatas, embedder(documents))
+
+
+def make_chatbot(index, embedder, mode, semantic_cache=None):
+    lexical_index = BM25Index.from_index(index) if mode != "vector" else None
+    # The reply echoes the prompt, so equal answers mean equal retrieved rows
+    generator = ResponseGenerator(backend=FakeBackend(reply=lambda prompt: prompt))
+    return Chatbot(
+        Retriever(index, embedder, lexical_index, mode=mode, reranker=MMRReranker()),
+        generator,
+        semantic_cache=semantic_cache,
+        country_index=CountryIndex(index.metadatas),
+    )
+
+
+@pytest.mark.parametrize("mode", ["vector", "hybrid", "lexical"])
+def test_batch_matches_one_by_one(index, embedder, mode):
+    expected = [make_chatbot(index, embedder, mode).get_response(query) for query in QUERIES]
+
+    embedder.calls = 0
+    assert make_chatbot(index, embedder, mode).get_responses(QUERIES) == expected
+    assert embedder.calls == 1
+
+
+def test_batch_embeds_once_with_the_semantic_cache(index, embedder):
+    chatbot = make_chatbot(index, embedder, "hybrid", SemanticCache())
+    embedder.calls = 0
+    chatbot.get_responses(QUERIES)
+    assert embedder.calls == 1
+
+
+def test_retrieve_many_matches_retrieve(index, embedder):
+    retriever = Retriever(index, embedder, BM25Index.from_index(index), mode="hybrid", reranker=MMRReranker())
+    assert retriever.retrieve_many(QUERIES) == [retriever.retrieve(query) for query in QUERIES]
@@ -0,0 +1,38 @@
+from context import ContextBuilder, count_tokens, truncate_tokens
+
+DOCUMENTS = [
+    "Country: France, Capital: Paris, Population: 64768389, Area: 547030.0",
+    "Country: France, Capital: Paris, Population: 64768389, Area: 547030.0",
+    "Country: Germany, Capital: Berlin, Population: 81802257, Area: 357021.0",
+]
+METADATAS = [
+    {"name": "France", "capital": "Paris", "_fingerprint": "a"},
+    {"name": "France", "capital": "Paris", "_fingerprint": "a"},
+    {"name": "Germany", "capital": "Berlin", "_fingerprint": "b"},
+]
+
+
+def test_metadata_is_rendered_as_a_table_without_duplicates():
+    context = ContextBuilder().build(DOCUMENTS, METADATAS)
+    assert context.splitlines() == ["name | capital", "France | Paris", "Germany | Berlin"]
+
+
+def test_best_rows_come_first_by_distance():
+    context = ContextBuilder().build(DOCUMENTS, METADATAS, distances=[0.5, 0.5, 0.1])
+    assert context.splitlines()[1] == "Germany | Berlin"
+
+
+def test_rows_stop_at_the_budget():
+    builder = ContextBuilder(max_tokens=count_tokens(f"- {DOCUMENTS[0]}") + 1)
+    assert builder.build(DOCUMENTS) == f"- {DOCUMENTS[0]}"
+
+
+def test_oversized_first_row_is_truncated():
+    context = ContextBuilder(max_tokens=8).build(["word " * 100])
+    assert context
+    assert count_tokens(context) <= 8
+
+
+def test_truncate_tokens():
+    assert truncate_tokens("a b c", 10) == "a b c"
+    assert count_tokens(truncate_tokens("one, two, three", 3)) == 3
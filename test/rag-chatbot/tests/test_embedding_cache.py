@@ -0,0 +1,83 @@
+import numpy as np
+
+from conftest import country
+from embedding_cache import CachedEmbeddingFunction
+from ingest import IngestPipeline
+from sync import build_rows, sync_collection
+
+
+def rows(n=25):
+    return build_rows([country(f"Country {i}", f"Capital {i}", f"{1000 + i}") for i in range(n)])
+
+
+def test_repeated_texts_are_served_from_the_cache(tmp_path, embedder):
+    cached = CachedEmbeddingFunction(embedder, path=str(tmp_path / "cache.sqlite3"))
+    first = cached(["a", "b", "a"])
+    assert embedder.texts == 2  # "a" is embedded once
+    np.testing.assert_allclose(cached(["b", "a"]), [first[1], first[0]], rtol=1e-6)
+    assert embedder.calls == 1
+    assert (cached.stats()["hits"], cached.stats()["misses"]) == (2, 3)
+
+
+def test_cache_persists_across_instances(tmp_path, embedder):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbeddingFunction(embedder, path=path)(["a"])
+    CachedEmbeddingFunction(embedder, path=path)(["a"])
+    assert embedder.calls == 1
+
+
+def test_cache_is_keyed_by_model(tmp_path, embedder):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbeddingFunction(embedder, path=path, model_name="one")(["a"])
+    CachedEmbeddingFunction(embedder, path=path, model_name="two")(["a"])
+    assert embedder.calls == 2
+
+
+def test_eviction_keeps_the_size_bound(tmp_path, embedder):
+    cached = CachedEmbeddingFunction(embedder, path=str(tmp_path / "cache.sqlite3"), max_entries=3)
+    cached(["a", "b", "c", "d", "e"])
+    assert cached.stats()["size"] == 3
+
+
+def test_hits_do_not_write_to_the_database(tmp_path, embedder):
+    cached = CachedEmbeddingFunction(embedder, path=str(tmp_path / "cache.sqlite3"))
+    cached(["a", "b"])
+    changes = cached._conn.total_changes
+    for _ in range(10):
+        cached(["a", "b"])
+    assert cached._conn.total_changes == changes
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path, embedder):
+    cached = CachedEmbeddingFunction(embedder, path=str(tmp_path / "cache.sqlite3"), max_entries=3)
+    for text in ["a", "b", "c"]:
+        cached([text])
+    cached(["a"])  # a hit: its last_used is written with the next insert
+    cached(["d"])
+    calls = embedder.calls
+    cached(["a", "c", "d"])
+    assert embedder.calls == calls
+    cached(["b"])
+    assert embedder.calls == calls + 1
+
+
+def test_second_sync_makes_no_embedding_calls(tmp_path, embedder, new_collection):
+    cached = CachedEmbeddingFunction(embedder, path=str(tmp_path / "cache.sqlite3"))
+    documents, metadatas, ids = rows()
+
+    collection = new_collection()
+    changes = sync_collection(collection, documents, metadatas, ids,
+                              pipeline=IngestPipeline(collection, cached, batch_size=10))
+    assert changes["added"] == len(ids)
+    calls = embedder.calls
+    assert calls > 0
+
+    # Unchanged rows are skipped by the fingerprint check...
+    changes = sync_collection(collection, documents, metadatas, ids,
+                              pipeline=IngestPipeline(collection, cached, batch_size=10))
+    assert changes["unchanged"] == len(ids)
+    # ...and rebuilding the store from scratch is answered by the embedding cache
+    rebuilt = new_collection()
+    sync_collection(rebuilt, documents, metadatas, ids, pipeline=IngestPipeline(rebuilt, cached, batch_size=10))
+    assert rebuilt.count() == len(ids)
+    assert embedder.calls == calls
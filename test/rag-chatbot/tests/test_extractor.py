@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import country_page
+from extractor import BACKENDS, extract_countries
+
+PAGES = {
+    "rows": country_page(25),
+    "missing_field": country_page(2).replace('<span class="country-area">11.5</span>', ""),
+    "extra_classes": country_page(1).replace('class="country-name"', 'class="big country-name bold"'),
+    "entities": country_page(1).replace("Capital 0", "Saint John&#39;s &amp; Co"),
+    "empty": "",
+    "whitespace": "  \n ",
+    "no_countries": "<html><body><p>Nothing here</p></body></html>",
+    "xml_declaration": '<?xml version="1.0" encoding="utf-8"?>\n' + country_page(3),
+}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("page", sorted(PAGES))
+def test_backends_agree_with_bs4(backend, page):
+    assert extract_countries(PAGES[page], backend=backend) == extract_countries(PAGES[page], backend="bs4")
+
+
+def test_rows_are_parsed():
+    countries = extract_countries(PAGES["rows"])
+    assert len(countries) == 25
+    assert countries[1] == {"name": "Country 1", "capital": "Capital 1", "population": "1,037", "area": "11.5"}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_rows_with_missing_fields_are_reported(backend):
+    missing = []
+    countries = extract_countries(PAGES["missing_field"], backend=backend, on_missing=missing.append)
+    assert [country["name"] for country in countries] == ["Country 0"]
+    assert missing == [{"name": "Country 1", "capital": "Capital 1", "population": "1,037", "area": None}]
@@ -0,0 +1,119 @@
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from conftest import country_page
+from extractor import extract_countries
+from fetcher import PageFetcher
+from sync import sync_records
+
+ETAG = '"v1"'
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """/page/<n> serves 10 countries with an ETag, /flaky fails twice with 503, /down always does."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+        if self.path == "/down" or (self.path == "/flaky" and hits <= 2):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        number = int(self.path.rsplit("/", 1)[-1]) if self.path.startswith("/page/") else 0
+        body = country_page(10, start=number * 10).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.daemon_threads = True
+    server.hits = {}
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_fetch_all_returns_every_page(site):
+    urls = [url(site, f"/page/{i}") for i in range(5)]
+    with PageFetcher(max_workers=3) as fetcher:
+        pages = list(fetcher.fetch_all(urls))
+    assert sorted(page.url for page in pages) == sorted(urls)
+    assert all(page.status_code == 200 and not page.not_modified for page in pages)
+
+
+def test_unchanged_page_is_revalidated_with_etag(site):
+    page_url = url(site, "/page/0")
+    with PageFetcher() as fetcher:
+        first = fetcher.fetch(page_url)
+        second = fetcher.fetch(page_url)
+    assert second.status_code == 304 and second.not_modified
+    assert second.text == first.text
+    assert site.hits["/page/0"] == 2
+
+
+def test_failed_requests_are_retried(site):
+    with PageFetcher(retries=3, backoff_factor=0) as fetcher:
+        page = fetcher.fetch(url(site, "/flaky"))
+    assert page.status_code == 200
+    assert site.hits["/flaky"] == 3
+
+
+def test_retries_give_up(site):
+    with PageFetcher(retries=2, backoff_factor=0) as fetcher:
+        with pytest.raises(requests.exceptions.RequestException):
+            fetcher.fetch(url(site, "/down"))
+    assert site.hits["/down"] == 3
+
+
+def test_stream_records_parses_each_page(site):
+    with PageFetcher(max_workers=2) as fetcher:
+        records = list(fetcher.stream_records([url(site, f"/page/{i}") for i in range(3)], extract_countries))
+    assert sorted(record["name"] for record in records) == sorted(f"Country {i}" for i in range(30))
+
+
+def test_records_are_ingested_as_pages_arrive(site, chroma_client, embedder, tmp_path):
+    from embedding_cache import CachedEmbeddingFunction
+
+    collection = chroma_client.create_collection(
+        f"test-{uuid.uuid4().hex}", embedding_function=CachedEmbeddingFunction(embedder, path=str(tmp_path / "cache.sqlite3"))
+    )
+    stored_before_page = []
+
+    def pages():
+        with PageFetcher(max_workers=1) as fetcher:
+            for i in range(3):
+                stored_before_page.append(collection.count())
+                yield from extract_countries(fetcher.fetch(url(site, f"/page/{i}")).text)
+
+    changes, (documents, metadatas, ids) = sync_records(collection, pages(), batch_size=10)
+    # Each page's rows were written before the next page was fetched
+    assert stored_before_page == [0, 10, 20]
+    assert changes["added"] == len(ids) == collection.count() == 30
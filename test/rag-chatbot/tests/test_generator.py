@@ -0,0 +1,24 @@
+import pytest
+
+from generator import FakeBackend, LLMBackend, ResponseGenerator
+
+
+def test_incomplete_backend_fails_at_construction():
+    class NoStream(LLMBackend):
+        def complete(self, prompt):
+            return "answer"
+
+    with pytest.raises(TypeError):
+        NoStream()
+
+
+def test_complete_joins_the_stream():
+    assert FakeBackend(reply="abcdefghij", chunk_size=3).complete("prompt") == "abcdefghij"
+
+
+def test_generate_stream_sends_the_context_to_the_backend():
+    prompts = []
+    generator = ResponseGenerator(backend=FakeBackend(reply=lambda prompt: prompts.append(prompt) or "ok"))
+    context = ([["Country: France, Capital: Paris"]], [[{"name": "France", "capital": "Paris"}]])
+    assert "".join(generator.generate_stream(context, "What is the capital of France?")) == "ok"
+    assert "Paris" in prompts[0] and "What is the capital of France?" in prompts[0]
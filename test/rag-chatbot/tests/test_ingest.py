@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from conftest import country
+from ingest import IngestPipeline, RateLimiter
+from sync import build_rows, sync_collection
+
+
+def rows(n=6):
+    return build_rows([country(f"Country {i}", f"Capital {i}", f"{1000 + i}") for i in range(n)])
+
+
+def crash(collection, embedder, checkpoint, documents, metadatas, ids):
+    """Ingest two batches of two rows, then fail as if the process died."""
+    def progress(metrics):
+        if metrics.batches_done == 2:
+            raise KeyboardInterrupt
+
+    pipeline = IngestPipeline(collection, embedder, batch_size=2, max_workers=1, checkpoint_path=checkpoint)
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.run(documents, metadatas, ids, progress=progress)
+
+
+def test_metrics_and_progress(new_collection, embedder):
+    documents, metadatas, ids = rows(5)
+    collection = new_collection()
+    seen = []
+    metrics = IngestPipeline(collection, embedder, batch_size=2).run(
+        documents, metadatas, ids, progress=lambda m: seen.append(m.rows_done)
+    )
+    assert collection.count() == 5
+    assert (metrics.total_rows, metrics.rows_done, metrics.batches_done) == (5, 5, 3)
+    assert sorted(seen) == seen and seen[-1] == 5
+    assert metrics.as_dict()["rows_per_sec"] > 0
+
+
+def test_resume_skips_finished_batches(tmp_path, new_collection, embedder):
+    checkpoint = str(tmp_path / "ingest.checkpoint.json")
+    documents, metadatas, ids = rows()
+    collection = new_collection()
+    crash(collection, embedder, checkpoint, documents, metadatas, ids)
+    assert collection.count() == 4
+
+    embedder.calls = 0
+    metrics = IngestPipeline(collection, embedder, batch_size=2, checkpoint_path=checkpoint).run(
+        documents, metadatas, ids
+    )
+    assert collection.count() == 6
+    assert (metrics.batches_skipped, metrics.batches_done, embedder.calls) == (2, 1, 1)
+    assert not (tmp_path / "ingest.checkpoint.json").exists()
+
+
+def test_checkpoint_of_another_collection_is_ignored(tmp_path, new_collection, embedder):
+    checkpoint = str(tmp_path / "ingest.checkpoint.json")
+    documents, metadatas, ids = rows()
+    crash(new_collection(), embedder, checkpoint, documents, metadatas, ids)
+
+    other = new_collection()
+    changes = sync_collection(other, documents, metadatas, ids,
+                              pipeline=IngestPipeline(other, embedder, batch_size=2,
+                                                      checkpoint_path=checkpoint))
+    assert changes["added"] == 6
+    assert other.count() == 6
+
+
+def test_checkpoint_is_not_trusted_over_the_store(tmp_path, new_collection, embedder):
+    checkpoint = str(tmp_path / "ingest.checkpoint.json")
+    documents, metadatas, ids = rows()
+    collection = new_collection()
+    crash(collection, embedder, checkpoint, documents, metadatas, ids)
+    collection.delete(ids=ids)  # the store was wiped after the crash
+
+    metrics = IngestPipeline(collection, embedder, batch_size=2, checkpoint_path=checkpoint).run(
+        documents, metadatas, ids
+    )
+    assert collection.count() == 6
+    assert (metrics.batches_skipped, metrics.batches_done) == (0, 3)
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+def test_pipeline_respects_requests_per_second(new_collection, embedder):
+    documents, metadatas, ids = rows(8)
+    started = time.monotonic()
+    IngestPipeline(new_collection(), embedder, batch_size=2, max_workers=4,
+                   requests_per_second=20).run(documents, metadatas, ids)
+    # Four embedding calls at 20/s: the last one starts at least 3 intervals after the first
+    assert time.monotonic() - started >= 3 / 20 * 0.9
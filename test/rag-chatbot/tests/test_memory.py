@@ -0,0 +1,109 @@
+from context import count_tokens
+from memory import ConversationMemory, extractive_summary
+from structured import CountryIndex
+
+INDEX = CountryIndex([
+    {"name": "France", "capital": "Paris"},
+    {"name": "Germany", "capital": "Berlin"},
+])
+
+
+def memory(**kwargs):
+    return ConversationMemory(entity_finder=INDEX.mentioned, **kwargs)
+
+
+def test_ring_buffer_keeps_the_last_turns_and_summarizes_the_rest():
+    chat = memory(max_turns=2)
+    for i in range(4):
+        chat.add_turn(f"question {i}", f"Answer {i}. More detail.")
+    chat.flush()
+    assert list(chat.turns) == [("question 2", "Answer 2. More detail."), ("question 3", "Answer 3. More detail.")]
+    assert chat.summary == "question 0 -> Answer 0.\nquestion 1 -> Answer 1."
+
+
+def test_extractive_summary_stays_within_its_budget():
+    turns = [(f"question {i} " * 5, f"answer {i} " * 5) for i in range(50)]
+    summary = extractive_summary("", turns, max_tokens=40)
+    assert count_tokens(summary) <= 40
+    assert summary.endswith(turns[-1][1].strip())
+
+
+def test_failing_summarizer_does_not_stall_folding():
+    def summarize(summary, turns):
+        raise ConnectionError("summarizer down")
+
+    chat = memory(max_turns=2, summarize=summarize)
+    for i in range(1000):
+        chat.add_turn(f"question {i}", f"answer {i}")
+    chat.flush()  # does not raise
+    assert chat._evicted == [] and chat._pending is None
+    # The turns were folded without the model, within the extractive summary's budget
+    assert "question 997 -> answer 997" in chat.summary
+    assert count_tokens(chat.summary) <= 150
+
+
+def test_summarizer_is_used_again_after_a_failure():
+    calls = []
+
+    def summarize(summary, turns):
+        calls.append(len(turns))
+        if len(calls) == 1:
+            raise ConnectionError("summarizer down")
+        return "summarized"
+
+    chat = memory(max_turns=1, summarize=summarize)
+    chat.add_turn("question 0", "answer 0")
+    chat.add_turn("question 1", "answer 1")
+    chat.flush()
+    assert chat.summary == "question 0 -> answer 0"
+    chat.add_turn("question 2", "answer 2")
+    chat.flush()
+    assert chat.summary == "summarized"
+
+
+def test_rewrite_names_the_last_country():
+    chat = memory()
+    assert chat.rewrite("and its capital?") == "and its capital?"
+    chat.add_turn("Tell me about France", "France is in Europe.")
+    assert chat.rewrite("and its capital?") == "and its capital? (France)"
+    assert chat.rewrite("What about their population?") == "What about their population? (France)"
+    assert chat.rewrite("What is the capital of Germany?") == "What is the capital of Germany?"
+    assert chat.rewrite("How are you?") == "How are you?"
+    # The answer can name the country too
+    chat.add_turn("Where is Berlin?", "Berlin is in the east of the country.")
+    assert chat.rewrite("and its population?") == "and its population? (Germany)"
+
+
+def test_note_entity_applies_before_the_answer():
+    chat = memory()
+    chat.note_entity("Tell me about Germany")
+    assert chat.rewrite("and its capital?") == "and its capital? (Germany)"
+
+
+def test_context_stays_within_the_token_budget():
+    chat = memory(max_turns=10, max_tokens=60)
+    for i in range(10):
+        chat.add_turn(f"Question number {i} about something", "A fairly long answer " * 3)
+    context = chat.context()
+    assert count_tokens(context) <= 60
+    # Newest turns are kept, oldest dropped first
+    assert "Question number 9" in context
+    assert "Question number 0" not in context
+
+
+def test_clear_forgets_everything():
+    chat = memory(max_turns=1)
+    chat.add_turn("Tell me about France", "France is in Europe.")
+    chat.add_turn("and Germany?", "Germany too.")
+    chat.flush()
+    chat.clear()
+    assert (len(chat), chat.summary, chat.last_entity, chat.context()) == (0, "", None, "")
+
+
+def test_placeholder_capital_is_not_an_entity():
+    chat = ConversationMemory(entity_finder=CountryIndex([
+        {"name": "France", "capital": "Paris"}, {"name": "Israel", "capital": "None"},
+    ]).mentioned)
+    chat.add_turn("Tell me about France", "France is in Europe.")
+    chat.add_turn("Which country is the oldest?", "None of the rows in the provided data say so.")
+    assert chat.rewrite("and what is its population?") == "and what is its population? (France)"
@@ -0,0 +1,99 @@
+import pytest
+
+from chatbot import Chatbot
+from conftest import country
+from generator import FakeBackend, ResponseGenerator
+from planner import Constraint, extract_constraints, plan_query
+from rerank import MMRReranker
+from retriever import Retriever
+from structured import CountryIndex
+from sync import build_rows
+from vector_index import NumpyIndex
+
+
+@pytest.mark.parametrize("query, where", [
+    ("countries with population over 100 million", {"population": {"$gt": 100000000}}),
+    ("Which countries have more than 100m people?", {"population": {"$gt": 100000000}}),
+    ("countries with a population of at least 50,000", {"population": {"$gte": 50000}}),
+    ("countries with 10 million inhabitants or more", {"population": {"$gte": 10000000}}),
+    ("countries larger than 500,000", {"area": {"$gt": 500000}}),
+    ("area under 1,000 km²", {"area": {"$lt": 1000}}),
+    ("area between 1,000 and 5,000 km2",
+     {"$and": [{"area": {"$gte": 1000}}, {"area": {"$lte": 5000}}]}),
+    ("between 10 and 20 million people",
+     {"$and": [{"population": {"$gte": 10000000}}, {"population": {"$lte": 20000000}}]}),
+    ("population over 1m and under 5m",
+     {"$and": [{"population": {"$gt": 1000000}}, {"population": {"$lt": 5000000}}]}),
+    ("countries with over 100m inhabitants and area under 500,000 km2",
+     {"$and": [{"population": {"$gt": 100000000}}, {"area": {"$lt": 500000}}]}),
+    # Words after the number that do not name what it counts
+    ("which countries have a population over 100 million in asia", {"population": {"$gt": 100000000}}),
+    ("countries with population above 50 million please", {"population": {"$gt": 50000000}}),
+    ("population over 10 million, none in europe", {"population": {"$gt": 10000000}}),
+    ("population over 1m and under 5m in africa",
+     {"$and": [{"population": {"$gt": 1000000}}, {"population": {"$lt": 5000000}}]}),
+])
+def test_range_questions_are_planned(query, where):
+    assert plan_query(query) == where
+
+
+@pytest.mark.parametrize("query", [
+    "population density over 100 people per km2",
+    "GDP over 1 trillion and population",
+    "countries with over 3 neighbours",
+    "Is the population of France over 70 million?",
+    "top 10 countries by population",
+    "What is the capital of France?",
+])
+def test_unrelated_numbers_are_not_planned(query):
+    assert plan_query(query) is None
+
+
+def test_numbers_with_their_own_noun_are_skipped():
+    constraints = extract_constraints("more than 2 official languages and population over 10m")
+    assert constraints == [Constraint("population", "$gt", 10000000)]
+
+
+def test_questions_about_one_country_are_not_filtered():
+    index = CountryIndex([{"name": "France", "capital": "Paris"}])
+    assert plan_query("Is France's population over 70 million?") == {"population": {"$gt": 70000000}}
+    assert plan_query("Is France's population over 70 million?", index.mentioned) is None
+    assert plan_query("countries with population over 70 million", index.mentioned) is not None
+
+
+@pytest.fixture
+def countries(embedder):
+    documents, metadatas, ids = build_rows(
+        [country(f"Country {i}", f"Capital {i}", f"{(i + 1) * 1_000_000:,}") for i in range(40)]
+    )
+    return NumpyIndex(ids, documents, metadatas, embedder(documents)), metadatas
+
+
+def test_filtered_retrieval_returns_every_match(countries, embedder):
+    index, _ = countries
+    retriever = Retriever(index, embedder, reranker=MMRReranker())
+    where = plan_query("countries with population over 30 million")
+    results = retriever.query("countries with population over 30 million", 20, where=where)
+    # Ten rows match; the reranker's relevance cutoff does not thin them out
+    assert len(results["ids"][0]) == 10
+    assert all(metadata["population"] > 30_000_000 for metadata in results["metadatas"][0])
+
+
+def test_chatbot_sends_only_matching_rows_to_the_model(countries, embedder):
+    index, metadatas = countries
+    prompts = []
+    chatbot = Chatbot(
+        Retriever(index, embedder, reranker=MMRReranker()),
+        ResponseGenerator(backend=FakeBackend(reply=lambda prompt: prompts.append(prompt) or "ok")),
+        country_index=CountryIndex(metadatas),
+    )
+    chatbot.get_response("Which countries have a population under 3 million?")
+    assert "Country 0" in prompts[0] and "Country 1" in prompts[0]
+    assert "Country 2 " not in prompts[0] and "Country 39" not in prompts[0]
+
+
+def test_placeholder_capital_does_not_block_the_filter():
+    index = CountryIndex([{"name": "Israel", "capital": "None"}, {"name": "France", "capital": "Paris"}])
+    assert plan_query("population over 10 million, none in europe", index.mentioned) == {
+        "population": {"$gt": 10000000}
+    }
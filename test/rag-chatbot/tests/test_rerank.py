@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from bm25 import BM25Index
+from rerank import MMRReranker, Reranker, make_reranker
+from retriever import Retriever
+from vector_index import NumpyIndex
+
+QUERY = np.array([1.0, 0.0, 0.0])
+
+
+def candidates(vectors):
+    ids = [f"row{i}" for i in range(len(vectors))]
+    results = {
+        "ids": [ids],
+        "documents": [[f"document {i}" for i in range(len(vectors))]],
+        "metadatas": [[{"i": i} for i in range(len(vectors))]],
+        "distances": [[0.0] * len(vectors)],
+    }
+    return results, np.asarray(vectors, dtype=np.float32)
+
+
+def test_near_duplicates_are_dropped():
+    results, embeddings = candidates([[1.0, 0.1, 0.0], [1.0, 0.1, 0.001], [0.8, 0.0, 0.6]])
+    reranked = MMRReranker().rerank("q", results, 3, QUERY, embeddings)
+    assert reranked["ids"][0] == ["row0", "row2"]
+
+
+def test_rows_below_min_relevance_are_dropped():
+    results, embeddings = candidates([[0.9, 0.1, 0.0], [0.1, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    reranked = MMRReranker(min_relevance=0.5).rerank("q", results, 3, QUERY, embeddings)
+    assert reranked["ids"][0] == ["row0"]
+    assert reranked["documents"][0] == ["document 0"]
+
+
+def test_min_keep_survives_the_cutoff():
+    results, embeddings = candidates([[0.1, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    reranked = MMRReranker(min_relevance=0.5, min_keep=1).rerank("q", results, 3, QUERY, embeddings)
+    assert reranked["ids"][0] == ["row0"]
+
+
+def test_pinned_rows_are_exempt_from_the_cutoff():
+    results, embeddings = candidates([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    reranked = MMRReranker(min_relevance=0.5).rerank("q", results, 2, QUERY, embeddings, pinned=["row1"])
+    assert reranked["ids"][0] == ["row1", "row0"]
+
+
+def test_without_embeddings_rows_are_truncated():
+    results, _ = candidates([[1.0, 0.0, 0.0]] * 4)
+    assert MMRReranker().rerank("q", results, 2)["ids"][0] == ["row0", "row1"]
+
+
+def test_reranker_is_abstract():
+    class NoRerank(Reranker):
+        pass
+
+    with pytest.raises(TypeError):
+        NoRerank()
+    with pytest.raises(ValueError):
+        make_reranker("best")
+    assert make_reranker("none") is None
+
+
+def test_hybrid_retrieval_keeps_the_exact_name_hit():
+    ids = ["country_france", "country_germany", "country_spain"]
+    documents = ["Country: France, Capital: Paris", "Country: Germany, Capital: Berlin",
+                 "Country: Spain, Capital: Madrid"]
+    # France's vector is far from the query, the others are close to it
+    embeddings = [[0.0, 1.0, 0.0], [0.9, 0.0, 0.1], [0.9, 0.1, 0.0]]
+    index = NumpyIndex(ids, documents, [{"name": d} for d in documents], embeddings)
+    retriever = Retriever(index, lambda texts: [QUERY.tolist() for _ in texts],
+                          BM25Index(ids, documents), mode="hybrid", reranker=MMRReranker())
+    assert retriever.query("Tell me about France", n_results=2)["ids"][0][0] == "country_france"
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from chatbot import Chatbot
+from conftest import FakeEmbedder, country
+from generator import FakeBackend, ResponseGenerator
+from ingest import IngestPipeline
+from main import build_semantic_cache
+from retriever import Retriever
+from semantic_cache import SemanticCache
+from store import DEFAULT_CONFIG
+from sync import build_rows, sync_collection
+
+QUESTION = "Which country has the most people in Africa?"
+PARAPHRASE = "Which African country has the largest population?"
+
+
+class ParaphraseEmbedder(FakeEmbedder):
+    """FakeEmbedder that places PARAPHRASE right next to QUESTION."""
+
+    def __call__(self, input):
+        texts = list(input)
+        vectors = super().__call__(texts)
+        for i, text in enumerate(texts):
+            if text == PARAPHRASE:
+                (original,) = FakeEmbedder.__call__(self, [QUESTION])
+                self.calls -= 1
+                vector = np.asarray(original) + 0.05 * np.asarray(vectors[i])
+                vectors[i] = (vector / np.linalg.norm(vector)).tolist()
+        return vectors
+
+
+def test_lookup_honours_the_threshold():
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "answer", {})
+    assert cache.lookup([0.95, 0.05]) == "answer"
+    assert cache.lookup([0.5, 0.5]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_oldest_entry_is_overwritten():
+    cache = SemanticCache(maxsize=2)
+    for i, vector in enumerate([[1, 0, 0], [0, 1, 0], [0, 0, 1]]):
+        cache.add(vector, f"answer {i}", {})
+    assert cache.lookup([1, 0, 0]) is None
+    assert cache.lookup([0, 0, 1]) == "answer 2"
+
+
+def test_build_semantic_cache_follows_config():
+    assert build_semantic_cache(DEFAULT_CONFIG) is None
+    cache = build_semantic_cache({**DEFAULT_CONFIG, "semantic_cache": True, "semantic_cache_threshold": 0.8})
+    assert cache.threshold == 0.8
+
+
+@pytest.fixture
+def store(new_collection):
+    collection = new_collection()
+    embedder = ParaphraseEmbedder()
+    countries = [country("Nigeria", "Abuja", "154,000,000"), country("Kenya", "Nairobi", "40,046,566")]
+    sync_collection(collection, *build_rows(countries), pipeline=IngestPipeline(collection, embedder))
+    return collection, embedder, countries
+
+
+def chatbot(store, threshold):
+    collection, embedder, _ = store
+    prompts = []
+    backend = FakeBackend(reply=lambda prompt: prompts.append(prompt) or "Nigeria.")
+    bot = Chatbot(Retriever(collection, embedder), ResponseGenerator(backend=backend),
+                  semantic_cache=SemanticCache(threshold=threshold), planner=None)
+    return bot, prompts
+
+
+def test_paraphrase_is_answered_without_the_model(store):
+    bot, prompts = chatbot(store, threshold=0.92)
+    assert bot.get_response(QUESTION) == "Nigeria."
+    assert bot.get_response(PARAPHRASE) == "Nigeria."
+    assert len(prompts) == 1
+    assert bot.semantic_cache.hits == 1
+
+
+def test_paraphrase_below_the_threshold_calls_the_model(store):
+    bot, prompts = chatbot(store, threshold=0.9999)
+    bot.get_response(QUESTION)
+    bot.get_response(PARAPHRASE)
+    assert len(prompts) == 2
+
+
+def test_changed_source_invalidates_the_answer(store):
+    collection, embedder, countries = store
+    bot, prompts = chatbot(store, threshold=0.92)
+    bot.get_response(QUESTION)
+
+    countries[1] = country("Kenya", "Nairobi", "200,000,000")
+    sync_collection(collection, *build_rows(countries), pipeline=IngestPipeline(collection, embedder))
+    bot.get_response(PARAPHRASE)
+    assert len(prompts) == 2
+    assert bot.semantic_cache.hits == 0
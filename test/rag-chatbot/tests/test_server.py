@@ -0,0 +1,107 @@
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+from chatbot import Chatbot
+from conftest import country
+from generator import FakeBackend, ResponseGenerator
+from retriever import Retriever
+from server import ChatServer, publish_snapshot
+from store import latest_snapshot, load_snapshot, load_store_config, open_collection
+from sync import build_rows
+from vector_index import NumpyIndex
+
+
+@pytest.fixture
+def server(embedder):
+    documents, metadatas, ids = build_rows([country(f"Country {i}") for i in range(10)])
+    index = NumpyIndex(ids, documents, metadatas, embedder(documents))
+    chatbot = Chatbot(Retriever(index, embedder), ResponseGenerator(backend=FakeBackend(reply="The answer.")))
+    server = ChatServer(("127.0.0.1", 0), chatbot, max_in_flight=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read().decode("utf-8")
+    finally:
+        connection.close()
+
+
+def test_chat_returns_json(server):
+    status, body = request(server, "POST", "/chat", json.dumps({"message": "Tell me about Country 3"}))
+    assert status == 200
+    assert json.loads(body) == {"response": "The answer."}
+
+
+def test_chat_streams_sse(server):
+    status, body = request(server, "POST", "/chat", json.dumps({"message": "Country 3?", "stream": True}))
+    assert status == 200
+    deltas = [json.loads(line[len("data: "):])["delta"] for line in body.splitlines() if line.startswith("data: {\"delta")]
+    assert "".join(deltas) == "The answer."
+    assert "event: done" in body
+
+
+def test_metrics_name_the_worker(server):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader("X-Worker") == str(os.getpid())
+        assert "rag_stage_seconds" in response.read().decode("utf-8")
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("body, headers", [
+    ("not json", {}),
+    (json.dumps({"message": "  "}), {}),
+    (json.dumps({"text": "hi"}), {}),
+    ("{}", {"Content-Length": "abc"}),
+    ("{}", {"Content-Length": "-1"}),
+])
+def test_bad_requests_get_400(server, body, headers):
+    status, _ = request(server, "POST", "/chat", body, headers)
+    assert status == 400
+
+
+def test_busy_server_replies_503(server):
+    for _ in range(server.max_in_flight):
+        assert server.acquire()
+    try:
+        status, _ = request(server, "POST", "/chat", json.dumps({"message": "hi"}))
+    finally:
+        for _ in range(server.max_in_flight):
+            server.release()
+    assert status == 503
+
+
+def test_health_and_unknown_paths(server):
+    assert request(server, "GET", "/health")[0] == 200
+    assert request(server, "GET", "/nope")[0] == 404
+
+
+def test_snapshot_is_published_from_another_process(tmp_path, embedder):
+    config = {
+        **load_store_config(None),
+        "persist_directory": str(tmp_path / "chroma"),
+        "snapshot_directory": str(tmp_path / "snapshots"),
+    }
+    collection, _ = open_collection(config)
+    documents, metadatas, ids = build_rows([country(f"Country {i}") for i in range(5)])
+    collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embedder(documents))
+
+    publish_snapshot(config)
+    snapshot = load_snapshot(latest_snapshot(config["snapshot_directory"]))
+    assert sorted(snapshot.get()["ids"]) == sorted(ids)
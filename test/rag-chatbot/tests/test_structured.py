@@ -0,0 +1,97 @@
+import pytest
+
+from structured import CountryIndex, parse_number
+
+METADATAS = [
+    {"name": "France", "capital": "Paris", "population": "64,768,389", "area": "547030.0"},
+    {"name": "Germany", "capital": "Berlin", "population": 81802257, "area": 357021.0},
+    {"name": "China", "capital": "Beijing", "population": 1330044000, "area": 9596960.0},
+    {"name": "Niger", "capital": "Niamey", "population": 15878271, "area": 1267000.0},
+    {"name": "Nigeria", "capital": "Abuja", "population": 154000000, "area": 923768.0},
+    {"name": "Vatican City", "capital": "Vatican City", "population": 921, "area": 0.4},
+]
+
+
+@pytest.fixture
+def index():
+    return CountryIndex(METADATAS)
+
+
+def test_parse_number():
+    assert parse_number("1,234") == 1234
+    assert parse_number("468.0") == 468.0
+    assert parse_number("n/a") is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is the capital of France?", "The capital of France is Paris."),
+    ("capital of nigeria", "The capital of Nigeria is Abuja."),
+    ("What's the population of France?", "The population of France is 64,768,389."),
+    ("population of Niger", "The population of Niger is 15,878,271."),
+    ("How many people live in Germany?", "The population of Germany is 81,802,257."),
+    ("What is the area of France?", "The area of France is 547,030.0 km²."),
+    ("How big is Germany?", "The area of Germany is 357,021.0 km²."),
+    ("Berlin is the capital of which country?", "Berlin is the capital of Germany."),
+    ("Which country has Abuja as its capital?", "Abuja is the capital of Nigeria."),
+    ("What is the largest country?", "China (9,596,960.0 km²)."),
+    ("smallest country in the world", "Vatican City (0.4 km²)."),
+    ("most populous country", "China (1,330,044,000)."),
+    ("largest country by population", "China (1,330,044,000)."),
+    ("top 2 by population", "1. China: 1,330,044,000\n2. Nigeria: 154,000,000"),
+    ("Bottom 1 countries by area", "1. Vatican City: 0.4 km²"),
+    ("3 largest countries", "1. China: 9,596,960.0 km²\n2. Niger: 1,267,000.0 km²\n3. Nigeria: 923,768.0 km²"),
+])
+def test_lookups_are_answered(index, query, expected):
+    assert index.answer(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "What language do people in France speak?",
+    "Does France have a large army?",
+    "What is the population of France and Germany?",
+    "How many people live in the capital of France?",
+    "most populous country in Europe",
+    "population density of France",
+    "What is the capital of France in 1800?",
+    "What is the largest city in France?",
+    "Is Paris the capital of France?",
+    "What is the population of Atlantis?",
+    "Tell me about France",
+    "countries with population over 100 million",
+    "top 0 by population",
+    "0 largest countries",
+])
+def test_anything_else_falls_back_to_rag(index, query):
+    assert index.answer(query) is None
+
+
+def test_longest_name_wins_in_mentioned(index):
+    assert index.mentioned("Tell me about Nigeria") == "Nigeria"
+    assert index.mentioned("What about Niamey?") == "Niger"
+    assert index.mentioned("and Atlantis?") is None
+
+
+def test_empty_index_answers_nothing():
+    assert CountryIndex().answer("capital of France") is None
+
+
+def test_ranking_without_values_falls_back_to_rag():
+    index = CountryIndex([{"name": "France", "capital": "Paris", "population": "n/a", "area": "n/a"}])
+    assert index.answer("top 3 by population") is None
+    assert index.answer("largest country") is None
+
+
+def test_placeholder_and_shared_capitals_name_no_country():
+    index = CountryIndex(METADATAS + [
+        {"name": "Israel", "capital": "None", "population": "7353985", "area": "20770.0"},
+        {"name": "Antarctica", "capital": "None", "population": "0", "area": "1.4E7"},
+        {"name": "Tokelau", "capital": "", "population": "1466", "area": "10.0"},
+        {"name": "Northland", "capital": "Twin City", "population": "10", "area": "1.0"},
+        {"name": "Southland", "capital": "Twin City", "population": "10", "area": "1.0"},
+    ])
+    assert index.mentioned("None of the rows in the provided data say so.") is None
+    assert index.mentioned("Tell me about Twin City") is None
+    assert index.mentioned("Tell me about Israel") == "Israel"
+    assert index.answer("None is the capital of which country?") is None
+    assert index.answer("What is the capital of Israel?") is None
+    assert index.answer("Berlin is the capital of which country?") == "Berlin is the capital of Germany."
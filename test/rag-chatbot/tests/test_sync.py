@@ -0,0 +1,46 @@
+from conftest import country
+from ingest import IngestPipeline
+from sync import FINGERPRINT_KEY, build_rows, sync_collection, sync_records
+
+
+def test_build_rows_types_numbers_and_drops_duplicates():
+    documents, metadatas, ids = build_rows([
+        country("France", "Paris", "64,768,389", "547030.0"),
+        country("France", "Paris"),
+        country("Nowhere", "None", "n/a", ""),
+    ])
+    assert ids == ["country_france", "country_nowhere"]
+    assert metadatas[0] == {"name": "France", "capital": "Paris", "population": 64768389, "area": 547030.0}
+    assert "population" not in metadatas[1] and "area" not in metadatas[1]
+
+
+def test_sync_only_touches_changed_rows(new_collection, embedder):
+    collection = new_collection()
+    rows = build_rows([country(f"Country {i}") for i in range(5)])
+    sync_collection(collection, *rows, pipeline=IngestPipeline(collection, embedder))
+    embedded = embedder.texts
+
+    changed = build_rows([country(f"Country {i}", population="2,000" if i == 0 else "1,000") for i in range(4)])
+    changes = sync_collection(collection, *changed, pipeline=IngestPipeline(collection, embedder))
+    assert changes == {"added": 0, "updated": 1, "deleted": 1, "unchanged": 3}
+    assert embedder.texts == embedded + 1
+    stored = collection.get(ids=["country_country-0"], include=["metadatas"])["metadatas"][0]
+    assert stored["population"] == 2000 and FINGERPRINT_KEY in stored
+
+
+def test_sync_records_matches_sync_collection(new_collection, embedder):
+    countries = [country(f"Country {i}") for i in range(25)] + [country("Country 3")]
+    collection = new_collection()
+    changes, rows = sync_records(collection, iter(countries), batch_size=10,
+                                 pipeline=IngestPipeline(collection, embedder, batch_size=4))
+    assert rows == build_rows(countries)
+    assert changes == {"added": 25, "updated": 0, "deleted": 0, "unchanged": 0}
+    assert collection.count() == 25
+
+
+def test_empty_scrape_deletes_nothing(new_collection, embedder):
+    collection = new_collection()
+    sync_collection(collection, *build_rows([country("France")]), pipeline=IngestPipeline(collection, embedder))
+    changes, _ = sync_records(collection, iter([]), pipeline=IngestPipeline(collection, embedder))
+    assert changes["deleted"] == 0
+    assert collection.count() == 1
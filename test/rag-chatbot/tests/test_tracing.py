@@ -0,0 +1,31 @@
+from tracing import Tracer
+
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(enabled=False, jsonl_path=str(path))
+    with tracer.span("retrieve"):
+        pass
+    tracer.count("cache.hits")
+    tracer.observe("generate_first_token", 0.1)
+    assert tracer.summary() == {"stages": {}, "counters": {}}
+    assert not path.exists()
+
+
+def test_enabled_tracer_summarizes_and_exports(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(enabled=True, jsonl_path=str(path))
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        tracer.observe("retrieve", seconds)
+    with tracer.span("generate", model="fake"):
+        pass
+    tracer.count("cache.hits", 2)
+
+    summary = tracer.summary()
+    assert summary["stages"]["retrieve"]["count"] == 4
+    assert summary["stages"]["retrieve"]["p50"] == 0.3
+    assert summary["counters"] == {"cache.hits": 2}
+    assert len(path.read_text().splitlines()) == 5
+    text = tracer.prometheus_text()
+    assert 'rag_stage_seconds_count{stage="retrieve"} 4' in text
+    assert 'rag_events_total{event="cache.hits"} 2' in text
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from conftest import country
+from sync import build_rows
+from vector_index import ChromaIndex, NumpyIndex, VectorIndex
+
+
+@pytest.fixture
+def rows(embedder):
+    documents, metadatas, ids = build_rows(
+        [country(f"Country {i}", f"Capital {i}", f"{1000 * (i + 1)}", f"{i}.5") for i in range(50)]
+    )
+    return ids, documents, metadatas, embedder(documents)
+
+
+def test_incomplete_index_fails_at_construction():
+    class CountOnly(VectorIndex):
+        def count(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        CountOnly()
+
+
+def test_nearest_row_is_the_query_itself(rows):
+    ids, documents, metadatas, embeddings = rows
+    index = NumpyIndex(ids, documents, metadatas, embeddings)
+    result = index.query(query_embeddings=[embeddings[7]], n_results=3)
+    assert result["ids"][0][0] == ids[7]
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-6)
+
+
+@pytest.mark.parametrize("where", [
+    {"population": {"$gt": 25000}},
+    {"$and": [{"area": {"$gte": 10}}, {"area": {"$lt": 20}}]},
+    {"capital": "Capital 3"},
+    {"name": {"$in": ["Country 1", "Country 2"]}},
+])
+def test_filters_match_chroma(rows, new_collection, where):
+    ids, documents, metadatas, embeddings = rows
+    collection = new_collection()
+    collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+    index = NumpyIndex(ids, documents, metadatas, embeddings)
+
+    assert sorted(index.get(where=where)["ids"]) == sorted(ChromaIndex(collection).get(where=where)["ids"])
+    query = [embeddings[0]]
+    expected = collection.query(query_embeddings=query, n_results=5, where=where)["ids"][0]
+    assert index.query(query_embeddings=query, n_results=5, where=where)["ids"][0] == expected
+
+
+def test_save_and_load(rows, tmp_path):
+    ids, documents, metadatas, embeddings = rows
+    index = NumpyIndex(ids, documents, metadatas, embeddings)
+    loaded = NumpyIndex.load(str(tmp_path), files=index.save(str(tmp_path)))
+    assert loaded.count() == index.count()
+    np.testing.assert_array_equal(loaded.vectors, index.vectors)
+    assert loaded.get(ids=[ids[3]])["metadatas"] == [metadatas[3]]
+
+
+def test_empty_collection_gives_empty_results(new_collection, embedder, tmp_path):
+    index = NumpyIndex.from_collection(new_collection(), embedder)
+    assert index.count() == 0
+    assert index.query(query_texts=["capital of France"], n_results=5) == {
+        "ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]],
+    }
+    assert embedder.calls == 0
+    assert index.query(query_embeddings=[[1.0, 0.0]], where={"population": {"$gt": 5}})["ids"] == [[]]
+
+    # The server publishes a snapshot before anything was scraped
+    index.save(str(tmp_path))
+    loaded = NumpyIndex.load(str(tmp_path))
+    assert loaded.count() == 0
+    assert loaded.query(query_embeddings=[[1.0, 0.0]])["ids"] == [[]]
+
+
+def test_empty_index_answers_through_the_retriever(embedder):
+    from bm25 import BM25Index
+    from rerank import MMRReranker
+    from retriever import Retriever
+
+    index = NumpyIndex([], [], [], [])
+    retriever = Retriever(index, embedder, BM25Index.from_index(index), mode="hybrid", reranker=MMRReranker())
+    assert retriever.query("What is the capital of France?")["ids"] == [[]]
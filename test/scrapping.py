@@ -1,10 +1,32 @@
+import os
+import sys
+import time
+
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
 import chromadb
 import chromadb.utils.embedding_functions as embedding_functions
 import google.generativeai as genai
 
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(APP_DIR, "rag-chatbot", "src"))
+from bm25 import BM25Index
+from cache import RAGCache
+from context import ContextBuilder, count_tokens
+from embedding_cache import CachedEmbeddingFunction
+from extractor import extract_countries
+from fetcher import PageFetcher
+from generator import GeminiBackend
+from ingest import IngestPipeline
+from memory import ConversationMemory
+from planner import plan_query
+from rerank import make_reranker
+from structured import CountryIndex
+from retriever import Retriever
+from store import load_store_config, open_client
+from sync import sync_records
+from tracing import tracer
+
 # Set page configuration
 st.set_page_config(
     page_title="Country Information Chatbot",
@@ -15,10 +37,31 @@ st.set_page_config(
 # API key - Removed hardcoded key. Will use st.secrets instead.
 # Make sure you have a .streamlit/secrets.toml file with your GOOGLE_API_KEY
 
+# Store settings shared with the command-line chatbot
+CONFIG_FILE = os.path.join(APP_DIR, "rag-chatbot", "config.json")
+
+# Pages to scrape, add sibling pages here to scrape them concurrently
+SOURCE_URLS = ["https://www.scrapethissite.com/pages/simple/"]
+
+# Chat messages kept (and re-rendered) per session; older turns live on in the
+# conversation memory's summary
+MAX_MESSAGES = 40
+
+# Rows retrieved for range questions, whose candidates are pre-filtered
+FILTERED_RESULTS = 20
+
 # Initialize session state for chat history if it doesn't exist
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
+@st.cache_resource
+def get_store_config():
+    """Store settings from the rag-chatbot config, with paths resolved against its directory"""
+    config = load_store_config(CONFIG_FILE)
+    for key in ("persist_directory", "snapshot_directory"):
+        config[key] = os.path.join(os.path.dirname(CONFIG_FILE), config[key])
+    return config
+
 @st.cache_resource
 def initialize_resources():
     """Initialize and cache ChromaDB and Gemini resources"""
@@ -34,105 +77,123 @@ def initialize_resources():
     model = genai.GenerativeModel('gemini-1.5-flash') # Updated model name if needed, check Gemini docs
 
     # Initialize ChromaDB
-    client = chromadb.Client()
+    # Persistent store, so data from earlier runs is served without a re-scrape
+    config = get_store_config()
+    with tracer.span("open_store"):
+        client = open_client(config)
     google_ef = embedding_functions.GoogleGenerativeAiEmbeddingFunction(api_key=api_key)
+    # Cache embeddings on disk so a refresh with unchanged data makes no embedding calls
+    google_ef = CachedEmbeddingFunction(google_ef)
 
     # Try to get the collection, create it if it doesn't exist
     try:
         # Ensure collection name matches where it's used/created
-        collection = client.get_collection(name="country_data", embedding_function=google_ef)
+        collection = client.get_collection(name=config["collection_name"], embedding_function=google_ef)
     except Exception as e:
         # More specific exception handling might be needed depending on chromadb version
-        st.info(f"Collection 'country_data' not found or error accessing it: {e}. It might be created later.")
+        st.info(f"Collection '{config['collection_name']}' not found or error accessing it: {e}. It might be created later.")
         collection = None # Indicate collection doesn't exist yet
 
     return client, google_ef, model, collection
 
-def scrape_and_store_data():
-    """Scrape country data and store in ChromaDB"""
-    client, google_ef, _, _ = initialize_resources() # Get client and ef
+@st.cache_resource
+def get_fetcher():
+    """Pooled page fetcher, cached so conditional GETs can reuse earlier responses"""
+    return PageFetcher()
 
-    # Scrape data
-    url = "https://www.scrapethissite.com/pages/simple/"
-    try:
-        response = requests.get(url)
-        response.raise_for_status() # Raise an exception for bad status codes
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching data from {url}: {e}")
-        return 0 # Return 0 countries processed
+@st.cache_resource
+def get_rag_cache():
+    """Shared retrieval/answer cache, invalidated whenever the data is refreshed"""
+    return RAGCache(maxsize=1024, ttl=3600)
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+@st.cache_resource
+def get_country_index():
+    """In-memory index of country metadata, rebuilt on every refresh"""
+    index = CountryIndex()
+    _, _, _, collection = initialize_resources()
+    if collection is not None:
+        index.rebuild(collection.get(include=["metadatas"])["metadatas"])
+    return index
 
-    countries = []
-    for country_div in soup.find_all('div', class_='country'):
-        try:
-            name = country_div.find('h3', class_='country-name').text.strip()
-            capital = country_div.find('span', class_='country-capital').text.strip()
-            population = country_div.find('span', class_='country-population').text.strip()
-            area = country_div.find('span', class_='country-area').text.strip()
-            countries.append({
-                "name": name,
-                "capital": capital,
-                "population": population,
-                "area": area
-            })
-        except AttributeError:
-            st.warning("Skipping an entry due to missing data during scraping.")
-            continue # Skip this entry if any element is missing
-
-    if not countries:
-        st.warning("No country data scraped.")
-        return 0
+@st.cache_resource
+def get_lexical_index():
+    """BM25 index over the stored documents, rebuilt on every refresh"""
+    _, _, _, collection = initialize_resources()
+    if collection is not None:
+        return BM25Index.from_index(collection)
+    return BM25Index()
 
-    collection_name = "country_data" # Use a consistent collection name
+@st.cache_resource
+def get_reranker():
+    """Reranker named by the config's "reranker" setting (None for "none")"""
+    return make_reranker(get_store_config()["reranker"])
 
-    # Try to delete existing collection
-    try:
-        client.delete_collection(name=collection_name)
-        st.info(f"Existing collection '{collection_name}' deleted.")
-    except Exception as e:
-        st.info(f"Could not delete collection '{collection_name}' (it might not exist): {e}")
-        pass # Ignore if deletion fails (e.g., collection doesn't exist)
+@st.cache_resource
+def get_context_builder():
+    """Token-budgeted context builder shared by all requests"""
+    return ContextBuilder(max_tokens=400)
+
+def get_memory():
+    """Conversation memory for this browser session"""
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory(entity_finder=get_country_index().mentioned)
+    return st.session_state.memory
+
+def parse_countries(html):
+    """Extract country records from a scraped page"""
+    return extract_countries(
+        html,
+        on_missing=lambda row: st.warning("Skipping an entry due to missing data during scraping.")
+    )
 
-    # Create collection and store data
+def scrape_and_store_data():
+    """Scrape country data and store in ChromaDB"""
+    client, google_ef, _, _ = initialize_resources() # Get client and ef
+
+    collection_name = get_store_config()["collection_name"] # Same collection as the command-line chatbot
+
+    # Reuse the live collection so queries keep working while it is refreshed
     try:
-        collection = client.create_collection(name=collection_name, embedding_function=google_ef)
-        st.info(f"Collection '{collection_name}' created.")
+        collection = client.get_or_create_collection(name=collection_name, embedding_function=google_ef)
     except Exception as e:
-        st.error(f"Failed to create collection '{collection_name}': {e}")
+        st.error(f"Failed to open collection '{collection_name}': {e}")
         return 0 # Cannot proceed without collection
 
-    # Prepare data for insertion
-    documents = []
-    metadatas = []
-    ids = []
-
-    for i, country in enumerate(countries):
-        # Ensure data types are consistent if needed by ChromaDB or your logic
-        country_text = f"Country: {country['name']}, Capital: {country['capital']}, Population: {country['population']}, Area: {country['area']}"
-        documents.append(country_text)
-
-        metadatas.append({
-            "name": country["name"],
-            "capital": country["capital"],
-            "population": country["population"], # Consider converting to int/float if needed
-            "area": country["area"] # Consider converting to float if needed
-        })
-
-        ids.append(f"country_{i}")
-
-    # Add all countries to ChromaDB at once
+    # Pages are fetched concurrently and parsed as they arrive; each batch of rows
+    # is synced while later pages are still downloading. Stable per-country IDs
+    # mean only rows whose content changed are re-embedded, which also makes an
+    # interrupted sync resume where it stopped
     try:
-        collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        st.success(f"Added {len(countries)} countries to ChromaDB.")
+        pipeline = IngestPipeline(collection, google_ef)
+        with tracer.span("scrape_and_ingest", pages=len(SOURCE_URLS)):
+            changes, (documents, metadatas, ids) = sync_records(
+                collection, get_fetcher().stream_records(SOURCE_URLS, parse_countries), pipeline=pipeline
+            )
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error fetching data from {', '.join(SOURCE_URLS)}: {e}")
+        return 0 # Return 0 countries processed
     except Exception as e:
-        st.error(f"Failed to add data to ChromaDB: {e}")
+        st.error(f"Failed to sync data to ChromaDB: {e}")
         return 0 # Return 0 as data wasn't stored successfully
 
+    if not ids:
+        st.warning("No country data scraped.")
+        return 0
+
+    st.success(
+        f"Synced {len(ids)} countries to ChromaDB: {changes['added']} added, "
+        f"{changes['updated']} updated, {changes['deleted']} deleted, "
+        f"{changes['unchanged']} unchanged."
+    )
+    stats = google_ef.stats()
+    st.info(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses.")
+    if pipeline.metrics is not None:
+        st.info(f"Ingested {pipeline.metrics.rows_done} rows at {pipeline.metrics.rows_per_sec:.0f} rows/sec.")
+    if changes["added"] or changes["updated"] or changes["deleted"]:
+        get_rag_cache().invalidate() # Cached answers may be based on stale rows
+    get_country_index().rebuild(metadatas)
+    get_lexical_index().rebuild(ids, documents)
+
     # Update the cached collection reference after creation/update
     # This part is tricky with @st.cache_resource. A full rerun might be needed,
     # or a more complex state management approach if immediate reflection is required
@@ -140,7 +201,7 @@ def scrape_and_store_data():
     # For simplicity, let's rely on the user potentially needing to interact again
     # or the next call to initialize_resources picking up the new collection state.
 
-    return len(countries)
+    return len(ids)
 
 
 def retrieve_context(query, n_results=3):
@@ -151,7 +212,7 @@ def retrieve_context(query, n_results=3):
     if collection is None:
         # Attempt to get the collection again, in case it was created by scrape_and_store_data
         try:
-            collection = client.get_collection(name="country_data", embedding_function=google_ef)
+            collection = client.get_collection(name=get_store_config()["collection_name"], embedding_function=google_ef)
         except Exception:
              st.warning("No data found in ChromaDB. Please click 'Refresh Country Data' first.")
              return "No data available."
@@ -161,12 +222,25 @@ def retrieve_context(query, n_results=3):
         st.warning("Database is empty. Please click 'Refresh Country Data'.")
         return "No data available."
 
-    # Query ChromaDB for relevant documents
+    # Repeated questions reuse the documents retrieved the first time
+    # Range questions ("population over 100 million") only search the matching rows
+    where = plan_query(query, get_country_index().mentioned)
+    if where is not None:
+        n_results = FILTERED_RESULTS # list every match the filter lets through, not just the top few
+    cache_key = query if where is None else f"{query} {where}"
+    cache = get_rag_cache()
+    cached_context = cache.get_retrieval(cache_key)
+    if cached_context is not None:
+        return cached_context
+
+    # Query ChromaDB for relevant documents, fused with BM25 matches on exact
+    # names as configured by "retrieval_mode" (in "lexical" mode an unambiguous
+    # BM25 hit skips the embedding call altogether)
     try:
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+        retriever = Retriever(collection, google_ef, get_lexical_index(),
+                              mode=get_store_config()["retrieval_mode"], reranker=get_reranker())
+        with tracer.span("retrieve"):
+            results = retriever.query(query, n_results=n_results, where=where)
     except Exception as e:
         st.error(f"Error querying ChromaDB: {e}")
         return "Error retrieving data."
@@ -175,58 +249,107 @@ def retrieve_context(query, n_results=3):
     if not results or not results.get("documents") or not results["documents"][0]:
         return "Could not find relevant information for your query."
 
+    # Pack the best rows into a compact, token-budgeted table, skipping near-duplicates
     context = "Here is some information that might help answer the question:\n\n"
+    context += get_context_builder().build(results["documents"][0], results["metadatas"][0])
 
-    for doc in results["documents"][0]:
-        context += f"- {doc}\n" # Use bullet points for clarity
-
+    cache.set_retrieval(cache_key, context)
     return context
 
-def rag_chatbot(query):
-    """Generate response using RAG pattern with Gemini"""
-    # Get model reference
-    _, _, model, _ = initialize_resources()
-
+def build_prompt(query, history=None):
+    """Build the Gemini prompt for a query, with retrieved context when available"""
     # Step 1: Retrieve relevant context from vector database
     context = retrieve_context(query)
+    conversation = f"\n        Conversation so far:\n        {history}\n" if history else ""
 
     # Handle cases where context retrieval failed or returned no data
     if context in ["No data available.", "Error retrieving data.", "Could not find relevant information for your query."]:
-        # Optionally provide a direct response or try answering without context
-        # For now, let's inform the user based on the context message
-        # Or try a direct LLM call without context as a fallback (might hallucinate)
-        # return context # Return the error/status message directly
-
         # Fallback: Try answering without specific context (might be less accurate)
         st.warning(f"Could not retrieve specific context ({context}). Trying to answer generally.")
-        prompt = f"""You are a helpful assistant answering questions about countries.
+        return f"""You are a helpful assistant answering questions about countries.
+        {conversation}
         Answer the following question: {query}
         If you don't know the answer, say so.
         Answer:"""
-    else:
-        # Step 2: Create a prompt that includes the retrieved context
-        prompt = f"""You are a helpful assistant that answers questions about countries using ONLY the provided context.
+
+    # Step 2: Create a prompt that includes the retrieved context
+    return f"""You are a helpful assistant that answers questions about countries using ONLY the provided context.
         If the context doesn't contain the answer, state that the information is not available in the provided data. Do not make up information.
 
         Context:
         {context}
-
+        {conversation}
         Question: {query}
 
         Answer:"""
 
-    # Step 3: Generate a response using Gemini with the augmented prompt
+def rag_chatbot_stream(query, memory=None):
+    """Generate response using RAG pattern with Gemini, yielding text chunks as they arrive"""
+    if memory is None:
+        yield from answer_stream(query)
+        return
+    # Follow-ups ("and its capital?") are rewritten to name the last country mentioned,
+    # and the recent turns are passed along within a fixed token budget
+    chunks = []
+    for chunk in answer_stream(memory.rewrite(query), memory.context()):
+        chunks.append(chunk)
+        yield chunk
+    memory.add_turn(query, "".join(chunks))
+
+def answer_stream(query, history=None):
+    """Answer a single self-contained query, yielding text chunks as they arrive"""
+    # Structured lookups are answered straight from the metadata index
+    with tracer.span("structured_lookup"):
+        answer = get_country_index().answer(query)
+    if answer is not None:
+        tracer.count("structured.hits")
+        yield answer
+        return
+
+    # Get model reference
+    _, _, model, _ = initialize_resources()
+    backend = GeminiBackend(model)
+
+    prompt = build_prompt(query, history)
+
+    # Reuse the answer if this exact prompt was already sent to the model
+    cache = get_rag_cache()
+    cached_answer = cache.get_answer(prompt, backend.model_name)
+    if cached_answer is not None:
+        yield cached_answer
+        return
+
+    # Step 3: Stream a response from Gemini with the augmented prompt
+    chunks = []
     try:
-        response = model.generate_content(prompt)
-        # Accessing the text part might differ slightly based on the genai library version
-        # Check the structure of the 'response' object if response.text fails
-        return response.text
+        with tracer.span("generate", model=backend.model_name):
+            start = time.perf_counter()
+            for chunk in backend.stream(prompt):
+                if not chunks:
+                    tracer.observe("generate_first_token", time.perf_counter() - start)
+                chunks.append(chunk)
+                yield chunk
     except Exception as e:
         st.error(f"Error generating response from Gemini: {e}")
         # Check for specific API errors (e.g., quota, invalid key)
         if "API key not valid" in str(e):
              st.error("The provided Google API Key is invalid. Please check your secrets.toml file.")
-        return "Sorry, I encountered an error while generating the response."
+        yield "Sorry, I encountered an error while generating the response."
+        return
+
+    answer = "".join(chunks)
+    if tracer.enabled:
+        tracer.count("tokens.prompt", count_tokens(prompt))
+        tracer.count("tokens.completion", count_tokens(answer))
+    cache.set_answer(prompt, backend.model_name, answer)
+
+def rag_chatbot(query, memory=None):
+    """Generate response using RAG pattern with Gemini"""
+    return "".join(rag_chatbot_stream(query, memory))
+
+def set_tracing():
+    """Apply the sidebar tracing toggle to the shared tracer"""
+    tracer.enabled = st.session_state.tracing
 
 
 # Create the Streamlit UI
@@ -254,8 +377,34 @@ with st.sidebar:
     st.markdown("---")
     if st.button("Clear Chat History"):
         st.session_state.messages = []
+        get_memory().clear()
         st.rerun()
 
+    # Per-stage latency of the RAG pipeline, collected only while tracing is on
+    st.markdown("---")
+    st.header("Performance")
+    # The tracer is process-wide, so the toggle shows and switches tracing for
+    # every session; it only writes on a change, so sessions don't reset each other
+    st.session_state.tracing = tracer.enabled
+    st.toggle("Enable tracing (all sessions)", key="tracing", on_change=set_tracing)
+    trace_summary = tracer.summary()
+    if trace_summary["stages"]:
+        st.table([
+            {
+                "stage": name,
+                "calls": stage["count"],
+                "p50 (ms)": round(stage["p50"] * 1000, 1),
+                "p95 (ms)": round(stage["p95"] * 1000, 1),
+            }
+            for name, stage in sorted(trace_summary["stages"].items())
+        ])
+        st.caption(", ".join(f"{name}: {value:g}" for name, value in sorted(trace_summary["counters"].items())))
+        if st.button("Reset Timings"):
+            tracer.reset()
+            st.rerun()
+    elif tracer.enabled:
+        st.caption("Ask a question to collect timings.")
+
 # Display chat messages
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -272,15 +421,13 @@ if prompt := st.chat_input("Ask a question about any country..."):
 
     # Generate and display assistant response
     with st.chat_message("assistant"):
-        # Use a spinner during generation
-        with st.spinner("Thinking..."):
-            # Ensure resources are initialized before attempting RAG
-            # The call within rag_chatbot handles this via initialize_resources
-            response = rag_chatbot(prompt)
-            st.markdown(response) # Display the response text
-
-    # Add assistant response to chat history
+        # Stream the answer so the first tokens show up as soon as Gemini produces them
+        # Resources are initialized inside rag_chatbot_stream via initialize_resources
+        response = st.write_stream(rag_chatbot_stream(prompt, get_memory()))
+
+    # Add assistant response to chat history, keeping only the most recent messages
     st.session_state.messages.append({"role": "assistant", "content": response})
+    del st.session_state.messages[:-MAX_MESSAGES]
 
 # Initial check and instructions
 # Get client and collection status without triggering full resource init if possible
@@ -296,7 +443,7 @@ try:
         collection_count = collection_on_load.count()
     elif client: # If client exists, try getting collection again
          try:
-            collection_check = client.get_collection(name="country_data")
+            collection_check = client.get_collection(name=get_store_config()["collection_name"])
             collection_exists = True
             collection_count = collection_check.count()
          except Exception: